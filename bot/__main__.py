@@ -1,10 +1,10 @@
 import os
 import sys
 import logging
+import json
+import hashlib
 import asyncio
-import random
 from pyrogram import Client, idle
-from pyrogram.errors import FileReferenceExpired 
 from aiohttp import web
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
@@ -14,6 +14,18 @@ sys.path.append(os.getcwd())
 from bot.info import Config
 from bot.utils.database import db
 from bot.utils.stream_helper import media_streamer 
+from bot.utils.file_properties import get_stripe_peers, file_locations, get_file_dc, make_handoff_resolver
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.chunk_store import chunk_store
+from bot.utils.media_sessions import media_sessions
+from bot.utils.admission import admission, client_ip, Overloaded
+from bot.utils.http_range import starts_at_zero
+from bot.utils.metrics import metrics_middleware, on_response_prepare, metrics_handler
+from bot.utils.popularity import popularity
+from bot.utils.warmup import warmup_queue
+from bot.utils.indexer import indexer
+from bot.utils.location_health import location_health
+from bot.utils.drain import drain
 from bot.plugins.monitor import bandwidth_monitor
 
 # Logging Setup
@@ -49,7 +61,8 @@ async def send_log(bot, text):
 # --- AUTO RESTART ---
 async def auto_restart():
     logger.info("⏳ Scheduled Auto-Restart Triggered!")
-    os.execl(sys.executable, sys.executable, *sys.argv)
+    # চলমান স্ট্রিম শেষ হতে দিয়ে, হিসাব সেভ করে, socket খোলা রেখে restart
+    await drain.restart("Auto-Restart")
 
 # --- WEB SERVER ROUTES ---
 routes = web.RouteTableDef()
@@ -62,7 +75,24 @@ async def root_route_handler(request):
         "maintainer": "AnimeToki"
     })
 
+# --- ❤️ READINESS (Drain mode এ 503, লোড ব্যালান্সার নতুন ট্রাফিক পাঠাবে না) ---
+@routes.get("/health", allow_head=True)
+async def health_handler(request):
+    if drain.draining:
+        return web.json_response({"status": "draining", **drain.stats()}, status=503)
+    return web.json_response({"status": "ok", "active_streams": admission.active})
+
 # --- 🟡 API ROUTE (Frontend এর জন্য JSON Data) ---
+def file_summary(file_data):
+    """ফ্রন্টএন্ডে দেখানোর মতো নাম আর সাইজ"""
+    f_name = file_data.get('file_name', 'Unknown File')
+    f_size = "Unknown"
+
+    # সাইজ ফরম্যাট করা
+    if file_data.get('file_size'):
+         f_size = humanbytes(int(file_data.get('file_size')))
+    return {"file_name": f_name, "file_size": f_size}
+
 @routes.get("/api/file/{file_id}")
 async def api_file_handler(request):
     try:
@@ -75,19 +105,11 @@ async def api_file_handler(request):
                 headers={"Access-Control-Allow-Origin": "*"}
             )
         
-        f_name = file_data.get('file_name', 'Unknown File')
-        f_size = "Unknown"
-        
-        # সাইজ ফরম্যাট করা
-        if file_data.get('file_size'):
-             f_size = humanbytes(int(file_data.get('file_size')))
-        
         # JSON রেসপন্স
-        return web.json_response({
-            "error": False,
-            "file_name": f_name,
-            "file_size": f_size
-        }, headers={"Access-Control-Allow-Origin": "*"}) # CORS Header
+        return web.json_response(
+            {"error": False, **file_summary(file_data)},
+            headers={"Access-Control-Allow-Origin": "*"} # CORS Header
+        )
         
     except Exception as e:
         return web.json_response(
@@ -95,8 +117,71 @@ async def api_file_handler(request):
             headers={"Access-Control-Allow-Origin": "*"}
         )
 
+# --- 📚 BULK API (সিজন পেজের সব এপিসোড একটাই রিকুয়েস্টে) ---
+API_CORS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
+async def read_bulk_ids(request):
+    """GET ?ids=a,b,c অথবা POST {"ids": [...]} (বা সরাসরি লিস্ট)"""
+    if request.method == "POST":
+        payload = await request.json()
+        ids = payload.get("ids") if isinstance(payload, dict) else payload
+    else:
+        ids = request.query.get("ids", "").split(",")
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        raise ValueError("ids must be a list of strings")
+    ids = list(dict.fromkeys(i.strip() for i in ids if i.strip()))
+    if not ids:
+        raise ValueError("No ids given")
+    if len(ids) > Config.API_BULK_LIMIT:
+        raise ValueError(f"Too many ids (max {Config.API_BULK_LIMIT})")
+    return ids
+
+@routes.get("/api/files")
+@routes.post("/api/files")
+async def api_files_handler(request):
+    try:
+        ids = await read_bulk_ids(request)
+    except Exception as e:
+        return web.json_response({"error": True, "message": str(e)}, status=400, headers=API_CORS)
+
+    try:
+        docs = await db.get_files(ids)
+    except Exception as e:
+        return web.json_response({"error": True, "message": str(e)}, status=500, headers=API_CORS)
+
+    body = json.dumps({
+        "error": False,
+        "files": {uid: (file_summary(doc) if doc else None) for uid, doc in docs.items()}
+    }, separators=(",", ":")).encode()
+
+    # ETag = কনটেন্টের hash, তাই ব্রাউজার/CDN একই লিস্ট আবার নামাবে না (304)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {
+        **API_CORS,
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={Config.API_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [t.strip().replace("W/", "", 1) for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return web.Response(status=304, headers=headers)
+
+    resp = web.Response(body=body, content_type="application/json", headers=headers)
+    resp.enable_compression()
+    return resp
+
+@routes.options("/api/files")
+async def api_files_preflight(request):
+    return web.Response(status=204, headers={**API_CORS, "Access-Control-Max-Age": "86400"})
+
 # --- 🔥 REQUEST PROCESSOR (Streaming) ---
 async def process_request(request):
+    ticket = None
     try:
         file_id = request.match_info['file_id']
         
@@ -114,53 +199,58 @@ async def process_request(request):
         else:
             db_file_name = file_data.get('file_name')
 
-        locations = file_data.get('locations', [])
-        
-        if not locations and file_data.get('msg_id'):
-            locations.append({'chat_id': Config.BIN_CHANNEL_1, 'message_id': file_data.get('msg_id')})
+        # cache এর ডকুমেন্ট যেন বদলে না যায়, তাই কপি করা
+        locations = file_locations(file_data)
 
-        # 3. Cluster Load Balancing
         all_clients = request.app['all_clients']
-        random.shuffle(all_clients) 
+
+        # ♻️ Restart এর জন্য drain চলছে: নতুন স্ট্রিম না
+        if drain.draining:
+            return web.Response(
+                text="♻️ Server Restarting! Try again shortly.", status=503,
+                headers={"Retry-After": str(Config.RETRY_AFTER), "Access-Control-Allow-Origin": "*"}
+            )
+
+        # 🚦 Admission Control (সীমা পার হলে queue, তারপর 503)
+        if request.method != "HEAD":
+            try:
+                ticket = await admission.acquire(client_ip(request), all_clients)
+            except Overloaded as e:
+                return web.Response(
+                    text="⏳ Server Busy! Try again shortly.", status=503,
+                    headers={"Retry-After": str(e.retry_after), "Access-Control-Allow-Origin": "*"}
+                )
+
+        # 3. Cluster Load Balancing (কম লোডের সুস্থ ক্লায়েন্ট আগে, FloodWait এ থাকা গুলো বাদ)
+        candidates = client_scheduler.candidates(all_clients, dc_id=get_file_dc(file_data))
+        candidates = [c for c in candidates if admission.session_has_room(c)] or candidates
         
-        src_msg = None
-        working_client = None
-
-        # 4. File Hunting
-        for client in all_clients:
-            for loc in locations:
-                chat_id = loc.get('chat_id')
-                msg_id = loc.get('message_id')
-                if not chat_id or not msg_id: continue
-                try:
-                    msg = await client.get_messages(chat_id, msg_id)
-                    if msg and (msg.document or msg.video or msg.audio):
-                        src_msg = msg
-                        working_client = client
-                        break 
-                except: continue
-            if src_msg: break 
+        # 4. File Hunting (সুস্থ কপি + ক্লায়েন্ট জোড়া আগে, মৃত/অ্যাক্সেস নেই এমন কপি পরে)
+        working_client, src_msg = await location_health.locate(file_id, file_data, candidates, locations)
 
         if not src_msg:
             return web.Response(text="❌ File Not Found! (Check Bot Admins)", status=410)
 
+        if ticket:
+            admission.bind(ticket, working_client)
+            # 🔥 Seek এর Range রিকুয়েস্ট নতুন ভিউ না, শুধু শুরু থেকে রিকুয়েস্ট গোনা হয়
+            if starts_at_zero(request.headers.get("Range"), file_data.get('file_size') or 0):
+                popularity.hit(file_id)
+            # ⚡ প্রথম রিকুয়েস্টে moov/শেষের চাঙ্ক আগে থেকে (প্লেয়ারের পরের রিকুয়েস্ট)
+            warmup_queue.submit(file_id)
+
         # ❌ Access Log Removed (Quiet Mode)
 
-        # 5. Streaming (With Error Fix)
-        try:
-            return await media_streamer(request, src_msg, custom_file_name=db_file_name)
-        
-        except FileReferenceExpired:
-            logger.warning(f"⚠️ FileRef Expired. Refreshing...")
-            try:
-                refresh_msg = await working_client.get_messages(src_msg.chat.id, src_msg.id)
-                return await media_streamer(request, refresh_msg, custom_file_name=db_file_name)
-            except Exception as e:
-                logger.error(f"❌ Refresh Failed: {e}")
-                # শুধু রিফ্রেশ এরর হলে লগে পাঠাবে
-                if request.app.get('bot'):
-                    asyncio.create_task(send_log(request.app['bot'], f"❌ **Refresh Failed:**\n`{db_file_name}`\nError: `{e}`"))
-                return web.Response(text="❌ Refresh Failed! Try again later.", status=500)
+        # 🧬 Striped Mode: বাকি ক্লায়েন্টরাও একই ফাইলের চাঙ্ক আনবে
+        peers = []
+        if Config.STRIPED_STREAMING and len(candidates) > 1 and request.method != "HEAD":
+            peers = await get_stripe_peers(candidates, working_client, src_msg.chat.id, src_msg.id)
+
+        # 🔁 FloodWait Handoff: স্ট্রিমের মাঝে অন্য ক্লায়েন্টে চলে যাওয়ার জন্য
+        resolver = make_handoff_resolver(all_clients, src_msg.chat.id, src_msg.id)
+
+        # 5. Streaming (FileReferenceExpired সহ সব মাঝপথের এরর stream_helper নিজেই resume করে)
+        return await media_streamer(request, src_msg, custom_file_name=db_file_name, peers=peers, resolver=resolver)
 
     except Exception as e:
         # 📢 SEND ERROR LOG (ONLY IF SERVER ERROR)
@@ -170,13 +260,18 @@ async def process_request(request):
         logger.error(f"Server Error: {e}")
         return web.Response(text=f"Server Error: {e}", status=500)
 
-@routes.get("/stream/{file_id}")
+    finally:
+        # স্ট্রিম শেষ (StreamResponse লেখা শেষ) → স্লট ফেরত
+        if ticket:
+            admission.release(ticket)
+
+@routes.get("/stream/{file_id}", allow_head=True)
 async def stream_route_handler(request): return await process_request(request)
 
-@routes.get("/watch/{file_id}")
+@routes.get("/watch/{file_id}", allow_head=True)
 async def watch_handler(request): return await process_request(request)
 
-@routes.get("/dl/{file_id}")
+@routes.get("/dl/{file_id}", allow_head=True)
 async def download_handler(request): return await process_request(request)
 
 # --- 🚀 CLUSTER STARTUP LOGIC ---
@@ -221,33 +316,79 @@ async def start_streamer():
         logger.error("❌ No Bots Found! Add SESSION_STRING.")
         return
 
-    app = web.Application(client_max_size=None)
+    # 🛠️ DB Migration (index + storage কাউন্টার)
+    try:
+        await db.migrate()
+    except Exception as e:
+        logger.warning(f"DB Migration Failed: {e}")
+
+    # 🔐 Auth লিস্ট মেমরিতে (gatekeeper এর জন্য) + অন্য নোডের পরিবর্তন sync
+    try:
+        await db.load_auth()
+    except Exception as e:
+        logger.warning(f"Auth List Load Failed: {e}")
+    asyncio.create_task(db.watch_auth(Config.AUTH_SYNC_INTERVAL))
+
+    # 💽 Disk Chunk Cache index লোড
+    await asyncio.get_running_loop().run_in_executor(None, chunk_store.load)
+
+    app = web.Application(client_max_size=None, middlewares=[metrics_middleware])
     app.add_routes(routes)
+    # 📈 Prometheus metrics
+    app.router.add_get("/metrics", metrics_handler)
+    app.on_response_prepare.append(on_response_prepare)
     app['all_clients'] = clients
     app['bot'] = clients[0]
 
     logger.info(f"🚀 Starting Cluster with {len(clients)} Bots...")
     for c in clients:
-        try: await c.start()
+        try:
+            await c.start()
+            await client_scheduler.register(c)
         except: pass
 
+    # 🔌 DC Media Session Pool (ব্যাকগ্রাউন্ডে warm-up + health check)
+    asyncio.create_task(media_sessions.warm_up(clients, Config.MEDIA_DCS))
+    media_sessions.start_health_checks()
+
     # 📢 SEND STARTUP LOG (System Ready Message)
     await send_log(clients[0], f"🚀 **System Started!**\nMode: `API + Quiet Speed`\nBots: `{len(clients)}`")
 
     # Bandwidth Monitor & Auto Restart
     asyncio.create_task(bandwidth_monitor())
+    # 🔥 Hot ফাইলের হিসাব flush + pre-warm
+    asyncio.create_task(popularity.run(clients))
+    # 🆕 নতুন/প্রথমবার রিকুয়েস্ট হওয়া ফাইলের head + moov warm-up (pin সহ)
+    if Config.WARMUP_NEW_FILES:
+        warmup_queue.start(clients)
+        db.on_new_file(warmup_queue.submit)
+    # 🩺 কপিগুলোর হেলথ রেকর্ড ফাইল ডকুমেন্টে flush
+    asyncio.create_task(location_health.run())
+    # 📇 /index কমান্ড সব ক্লায়েন্ট দিয়ে bin চ্যানেল স্ক্যান করে
+    indexer.attach(clients)
     scheduler = AsyncIOScheduler()
     scheduler.add_job(auto_restart, "interval", hours=4)
+    # 📇 নতুন আপলোড ক্যাটালগে তোলা (নতুন ফাইল হলে warm-up hook চলে)
+    if Config.INDEX_INTERVAL:
+        scheduler.add_job(indexer.run_incremental, "interval", minutes=Config.INDEX_INTERVAL)
+    # 💾 /stats এর ফাইল/সাইজ কাউন্টার ঠিক রাখা (অন্য নোডের insert আর delete ধরতে)
+    if Config.STORAGE_RECOUNT_HOURS:
+        scheduler.add_job(db.recount_storage, "interval", hours=Config.STORAGE_RECOUNT_HOURS)
     scheduler.start()
 
     runner = web.AppRunner(app, access_log=None)
     await runner.setup()
-    await web.TCPSite(runner, Config.BIND_ADRESS, Config.PORT).start()
+    # restart এর পরে আগের প্রসেসের socket (কানেকশন backlog সহ) ব্যবহার হয়
+    await web.SockSite(runner, drain.listen_socket(Config.BIND_ADRESS, Config.PORT)).start()
     
     logger.info(f"🌐 Server Running at: {Config.URL}")
     
     await idle()
     
+    warmup_queue.stop()
+    indexer.stop()
+    await media_sessions.stop_all()
+    await drain.persist()
     for c in clients: 
         if c.is_connected: await c.stop()
 
@@ -39,3 +39,90 @@ class Config:
     
     # OWNER ID
     OWNER_ID = int(environ.get("OWNER_ID", "0"))
+    # Auth লিস্ট অন্য নোডে বদলালে কত সেকেন্ড পরপর version চেক (change stream না থাকলে)
+    AUTH_SYNC_INTERVAL = int(environ.get("AUTH_SYNC_INTERVAL", "30"))
+
+    # --- 🟡 FRONTEND API ---
+    API_BULK_LIMIT = int(environ.get("API_BULK_LIMIT", "100"))        # /api/files এ সর্বোচ্চ id
+    API_CACHE_MAX_AGE = int(environ.get("API_CACHE_MAX_AGE", "300"))  # Cache-Control (seconds)
+    # /metrics (Prometheus) এর টোকেন, খালি রাখলে সবার জন্য খোলা
+    METRICS_TOKEN = environ.get("METRICS_TOKEN", "")
+
+    # --- ⚡ CACHE SETTINGS ---
+    FILE_CACHE_SIZE = int(environ.get("FILE_CACHE_SIZE", "5000"))
+    FILE_CACHE_TTL = int(environ.get("FILE_CACHE_TTL", "600"))         # seconds
+    FILE_CACHE_NEG_TTL = int(environ.get("FILE_CACHE_NEG_TTL", "15"))  # Not Found cache
+    # Resolved Message cache (File Reference কয়েক ঘণ্টা valid থাকে, তাই ১ ঘণ্টা নিরাপদ)
+    MSG_CACHE_SIZE = int(environ.get("MSG_CACHE_SIZE", "5000"))
+    MSG_CACHE_TTL = int(environ.get("MSG_CACHE_TTL", "3600"))
+
+    # --- 🚀 STREAMING ---
+    # Read-ahead: একটি স্ট্রিমে একসাথে কতগুলো 1MB চাঙ্ক রিকুয়েস্ট চলবে
+    PREFETCH_CHUNKS = int(environ.get("PREFETCH_CHUNKS", "4"))
+    # Striped mode: একটি স্ট্রিমের চাঙ্কগুলো সব ক্লাস্টার ক্লায়েন্ট দিয়ে ভাগ করে আনা
+    STRIPED_STREAMING = environ.get("STRIPED_STREAMING", "False").lower() in ("true", "1", "yes")
+    # একই ফাইলের ভিউয়ারদের জন্য শেয়ার করা সাম্প্রতিক চাঙ্ক (মেমরি: N x 1MB)
+    CHUNK_RING_SIZE = int(environ.get("CHUNK_RING_SIZE", "32"))
+    # মাঝপথে এরর হলে একটানা কতবার resume চেষ্টা (প্রতিবার backoff দ্বিগুণ)
+    STREAM_MAX_RETRIES = int(environ.get("STREAM_MAX_RETRIES", "5"))
+    # স্টার্টআপে কোন DC গুলোর media session আগে থেকে তৈরি রাখা হবে
+    MEDIA_DCS = [int(dc) for dc in environ.get("MEDIA_DCS", "1 2 3 4 5").split()]
+    MEDIA_SESSION_CHECK = int(environ.get("MEDIA_SESSION_CHECK", "60"))  # health check (seconds)
+
+    # --- 🧵 STREAM BUFFERS ---
+    # সব স্ট্রিম মিলিয়ে read-ahead বাফার বাজেট (N x 1MB), শেষ হলে স্ট্রিম একটা একটা চাঙ্কে চলে
+    STREAM_BUFFER_SLOTS = int(environ.get("STREAM_BUFFER_SLOTS", "256"))
+
+    # --- ♻️ GRACEFUL RESTART ---
+    DRAIN_TIMEOUT = int(environ.get("DRAIN_TIMEOUT", "120"))  # চলমান স্ট্রিমের জন্য সর্বোচ্চ অপেক্ষা (seconds)
+    REUSE_PORT = environ.get("REUSE_PORT", "False").lower() in ("true", "1", "yes")
+
+    # --- 📡 TRAFFIC ACCOUNTING (বাইট হিসাব কত সেকেন্ড পরপর Mongo তে flush হবে) ---
+    TRAFFIC_FLUSH_INTERVAL = int(environ.get("TRAFFIC_FLUSH_INTERVAL", "60"))
+
+    # --- 🔥 POPULARITY & PRE-WARM ---
+    POPULARITY_SIZE = int(environ.get("POPULARITY_SIZE", "1000"))                     # sketch এ কতগুলো ফাইল
+    POPULARITY_FLUSH_INTERVAL = int(environ.get("POPULARITY_FLUSH_INTERVAL", "300"))  # seconds
+    PREWARM_TOP = int(environ.get("PREWARM_TOP", "10"))            # প্রতিবার কতগুলো hot ফাইল
+    PREWARM_HEAD_CHUNKS = int(environ.get("PREWARM_HEAD_CHUNKS", "2"))
+    PREWARM_TAIL_CHUNKS = int(environ.get("PREWARM_TAIL_CHUNKS", "2"))  # MP4 না হলে (MKV cues)
+    # নতুন ফাইল যোগ হলে বা প্রথম রিকুয়েস্টে head/moov আগে থেকে আনা
+    WARMUP_NEW_FILES = environ.get("WARMUP_NEW_FILES", "True").lower() in ("true", "1", "yes")
+    WARMUP_WORKERS = int(environ.get("WARMUP_WORKERS", "2"))
+
+    # --- 📇 BIN CHANNEL INDEXER (/index) ---
+    # শেষ পাওয়া মেসেজের পরে টানা এতগুলো খালি batch (200 id করে) মানে চ্যানেলের শেষ
+    INDEX_EMPTY_BATCHES = int(environ.get("INDEX_EMPTY_BATCHES", "5"))
+    # পুরো স্ক্যান হয়ে যাওয়া চ্যানেলে নতুন মেসেজ খোঁজা (minutes, 0 = শুধু /index)
+    INDEX_INTERVAL = int(environ.get("INDEX_INTERVAL", "15"))
+
+    # --- 💾 STORAGE STATS ---
+    # মেইন বটের যোগ করা আর মুছে ফেলা ফাইল কাউন্টারে আসে না, তাই মাঝে মাঝে পুরো কালেকশন গোনা (hours, 0 = বন্ধ)
+    STORAGE_RECOUNT_HOURS = int(environ.get("STORAGE_RECOUNT_HOURS", "6"))
+
+    # --- 🩺 LOCATION HEALTH (কোন কপি আগে চেষ্টা হবে) ---
+    LOCATION_HEALTH_SIZE = int(environ.get("LOCATION_HEALTH_SIZE", "10000"))  # মেমরিতে কতগুলো ফাইলের রেকর্ড
+    LOCATION_HEALTH_FLUSH_INTERVAL = int(environ.get("LOCATION_HEALTH_FLUSH_INTERVAL", "300"))
+    LOCATION_DENY_TTL = int(environ.get("LOCATION_DENY_TTL", "3600"))  # অ্যাক্সেস নেই এমন ক্লায়েন্ট আবার চেষ্টা (seconds)
+    LOCATION_RETRY_AFTER = int(environ.get("LOCATION_RETRY_AFTER", "60"))  # সাময়িক এররের পরে কপিটা পিছনে থাকে
+
+    # --- 🚦 ADMISSION CONTROL (0 = সীমা নেই) ---
+    MAX_STREAMS = int(environ.get("MAX_STREAMS", "500"))
+    MAX_STREAMS_PER_IP = int(environ.get("MAX_STREAMS_PER_IP", "8"))
+    MAX_STREAMS_PER_SESSION = int(environ.get("MAX_STREAMS_PER_SESSION", "100"))
+    STREAM_QUEUE_SIZE = int(environ.get("STREAM_QUEUE_SIZE", "200"))
+    STREAM_QUEUE_TIMEOUT = int(environ.get("STREAM_QUEUE_TIMEOUT", "15"))  # seconds
+    RETRY_AFTER = int(environ.get("RETRY_AFTER", "5"))
+    # Hugging Face/Heroku তে সব রিকুয়েস্ট রাউটারের IP থেকে আসে, আসল IP রাউটার X-Forwarded-For এর
+    # শেষে যোগ করে। এটা বন্ধ থাকলে সব ভিউয়ার একটাই per-IP বাকেটে পড়বে (MAX_STREAMS_PER_IP)।
+    # সরাসরি (প্রক্সি ছাড়া) চালালে False দিন, না হলে যে কেউ হেডার বানিয়ে per-IP সীমা এড়াতে পারে
+    TRUST_PROXY_HEADERS = environ.get("TRUST_PROXY_HEADERS", "True").lower() in ("true", "1", "yes")
+    TRUSTED_PROXY_HOPS = max(1, int(environ.get("TRUSTED_PROXY_HOPS", "1")))  # সামনে কতগুলো নিজেদের প্রক্সি
+
+    # --- 💽 DISK CHUNK CACHE (Hot ফাইলের জন্য, 0 দিলে বন্ধ) ---
+    CHUNK_CACHE_DIR = environ.get("CHUNK_CACHE_DIR", "cache/chunks")
+    CHUNK_CACHE_MB = int(environ.get("CHUNK_CACHE_MB", "1024"))
+    # নতুন/প্রথমবার রিকুয়েস্ট হওয়া ফাইলের head আর moov চাঙ্ক এই বাজেট পর্যন্ত pin থাকে
+    CHUNK_PIN_MB = int(environ.get("CHUNK_PIN_MB", "256"))
+    # একসাথে সর্বোচ্চ কতগুলো চাঙ্ক ডিস্কে লেখা চলবে, বেশি হলে লেখা বাদ (স্ট্রিম আটকায় না)
+    CHUNK_CACHE_PENDING_WRITES = int(environ.get("CHUNK_CACHE_PENDING_WRITES", "8"))
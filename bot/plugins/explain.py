@@ -0,0 +1,28 @@
+from pyrogram import Client, filters
+from bot.info import Config
+from bot.utils.database import db
+
+# --- 🔍 QUERY PLAN AUDIT (/explain) ---
+# প্রতিটা DB query কোন index ব্যবহার করছে; COLLSCAN মানে index নেই (লাইব্রেরি বড় হলে ধীর হবে)
+@Client.on_message(filters.command("explain") & filters.user(Config.OWNER_ID))
+async def explain_handler(bot, message):
+    msg = await message.reply("🔍 **Explaining Queries...**", quote=True)
+
+    try:
+        plans = await db.explain_queries()
+    except Exception as e:
+        return await msg.edit(f"❌ Error: {e}")
+
+    text = "🔍 **Query Plans**\n\n"
+    for name, plan in plans:
+        if "error" in plan:
+            text += f"❌ **{name}**: `{plan['error']}`\n\n"
+            continue
+        icon = "⚠️" if plan['collscan'] else "✅"
+        text += (
+            f"{icon} **{name}**\n"
+            f"`{plan['plan']}`\n"
+            f"Returned `{plan['returned']}` | Keys `{plan['keys']}` | Docs `{plan['docs']}` | `{plan['ms']} ms`\n\n"
+        )
+
+    await msg.edit(text)
@@ -12,7 +12,7 @@ async def auth_gatekeeper(bot, message):
     if user_id == Config.OWNER_ID:
         return  # পাস করে দাও (পরের কোড কাজ করবে)
 
-    # ২. Database চেক (অথরাইজড ইউজার কি না)
+    # ২. অথরাইজড ইউজার কি না (মেমরির set থেকে, DB কল নেই)
     if await db.is_user_allowed(user_id):
         return  # পাস করে দাও
 
@@ -0,0 +1,66 @@
+import asyncio
+from pyrogram import Client, filters
+from bot.info import Config
+from bot.utils.indexer import indexer, bin_channels
+from bot.utils.database import db
+from bot.plugins.status import get_readable_time
+
+
+def index_report(stats, title):
+    text = f"📇 **{title}**\n⏱ Elapsed: `{get_readable_time(stats['elapsed'])}`\n\n"
+    for ch in stats['channels']:
+        if ch['error']:
+            state = f"❌ {ch['error']}"
+        elif ch['finished']:
+            state = "✅ Done"
+        else:
+            state = "⏳ Scanning"
+        text += (
+            f"**{ch['chat_id']}** — {state}\n"
+            f"Checkpoint: `{ch['checkpoint']}` | Files: `{ch['files']}` | New: `{ch['new']}`\n\n"
+        )
+    return text
+
+
+# --- 📇 BIN CHANNEL INDEXER (/index) ---
+# সব bin চ্যানেলের পুরনো মেসেজ স্ক্যান করে ক্যাটালগে তোলা (checkpoint থেকে resume হয়)
+@Client.on_message(filters.command("index") & filters.user(Config.OWNER_ID))
+async def index_handler(bot, message):
+    action = message.command[1].lower() if len(message.command) > 1 else "start"
+
+    if action == "status":
+        if not indexer.scans:
+            return await message.reply("📇 Indexer hasn't run yet.", quote=True)
+        title = "Indexing..." if indexer.running else "Last Index Run"
+        return await message.reply(index_report(indexer.stats(), title), quote=True)
+
+    if action == "stop":
+        if not indexer.running:
+            return await message.reply("📇 Indexer is not running.", quote=True)
+        indexer.stop()
+        return await message.reply("🛑 **Stopping Indexer...** (progress is saved)", quote=True)
+
+    if action == "reset":
+        if indexer.running:
+            return await message.reply("⚠️ Stop the indexer first: `/index stop`", quote=True)
+        await db.reset_index_checkpoints()
+        return await message.reply("♻️ **Checkpoints Cleared.** Next `/index` starts from the beginning.", quote=True)
+
+    if indexer.running:
+        return await message.reply("📇 Already running. Check `/index status`", quote=True)
+
+    channels = bin_channels()
+    if not channels:
+        return await message.reply("❌ No BIN_CHANNEL configured.", quote=True)
+
+    msg = await message.reply(f"📇 **Indexing {len(channels)} Channels...**", quote=True)
+    # পুরো স্ক্যান অনেকক্ষণ চলে, হ্যান্ডলার আটকে না রেখে শেষে মেসেজ এডিট
+    asyncio.create_task(report_when_done(msg, indexer.start(channels)))
+
+
+async def report_when_done(msg, task):
+    try:
+        await task
+    except Exception as e:
+        return await msg.edit(f"❌ Indexer Error: {e}")
+    await msg.edit(index_report(indexer.stats(), "Index Stopped" if indexer.stopping else "Index Finished"))
@@ -1,8 +1,8 @@
 import os
-import sys
-import asyncio
 from pyrogram import Client, filters
 from bot.info import Config
+from bot.utils.admission import admission
+from bot.utils.drain import drain
 
 @Client.on_message(filters.command("restart") & filters.user(Config.OWNER_ID))
 async def restart_handler(bot, message):
@@ -18,10 +18,10 @@ async def restart_handler(bot, message):
         os.fsync(f.fileno())    # ডিস্কে লেখা নিশ্চিত করা
     
     # ৩. মেসেজ আপডেট করা
-    await msg.edit_text("🔄 **Rebooting...**")
+    await msg.edit_text(
+        f"🚰 **Draining `{admission.active}` Active Streams...**\n"
+        f"(max `{Config.DRAIN_TIMEOUT}s`, then Rebooting)"
+    )
     
-    # ৪. ১ সেকেন্ড সময় দেওয়া (Telegram API Sync হওয়ার জন্য)
-    await asyncio.sleep(1)
-    
-    # ৫. রিস্টার্ট কমান্ড
-    os.execl(sys.executable, sys.executable, *sys.argv)
+    # ৪. Drain → হিসাব সেভ → socket খোলা রেখে রিস্টার্ট
+    await drain.restart("Manual Restart")
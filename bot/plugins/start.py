@@ -13,6 +13,10 @@ My job is to provide high-speed **Download & Stream** links for **AnimeToki**.
 
 ⚙️ **System Commands (Owner Only):**
 • `/stats` - Check Oracle Bandwidth & Server Health
+• `/top [N]` - Most Streamed Files
+• `/explain` - MongoDB Query Plans (Index Audit)
+• `/index [status|stop|reset]` - Index All Bin Channels
+• `/repair [N]` - Files With Dead Replicas
 • `/restart` - Restart the Bot (Apply Updates)
 
 🔐 **Auth Management:**
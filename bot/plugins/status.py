@@ -3,6 +3,15 @@ import psutil
 from pyrogram import Client, filters
 from bot.utils.database import db
 from bot.utils.human_readable import humanbytes
+from bot.utils.file_properties import message_cache
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.chunk_store import chunk_store
+from bot.utils.custom_dl import chunk_flights
+from bot.utils.media_sessions import media_sessions
+from bot.utils.admission import admission
+from bot.utils.traffic import traffic
+from bot.utils.popularity import popularity
+from bot.utils.location_health import location_health, LocationRecord
 from bot.info import Config
 
 BOT_START_TIME = time.time()
@@ -35,24 +44,120 @@ async def stats_handler(bot, message):
     # Telegram Cloud Storage
     total_files, total_bytes = await db.get_total_storage()
     
-    # 🔥 ORACLE BANDWIDTH (Persistent DB Data)
+    # 🔥 ORACLE BANDWIDTH (Persistent DB Data + এখনো flush না হওয়া হিসাব)
     ul_bytes, dl_bytes = await db.get_streamer_bandwidth()
+    client_traffic = await db.get_streamer_clients()
+    for name, (p_ul, p_dl) in traffic.pending().items():
+        c_ul, c_dl = client_traffic.get(name, (0, 0))
+        client_traffic[name] = (c_ul + p_ul, c_dl + p_dl)
+        ul_bytes += p_ul
+        dl_bytes += p_dl
     
     server_upload = humanbytes(ul_bytes)
     server_download = humanbytes(dl_bytes)
     uptime = get_readable_time(time.time() - BOT_START_TIME)
 
+    # ⚡ Cache Stats
+    fc = db.file_cache.stats()
+    mc = message_cache.stats()
+    cc = chunk_store.stats()
+    sf = chunk_flights.stats()
+    ms = media_sessions.stats()
+    ad = admission.stats()
+    lh = location_health.stats()
+
+    # 🤖 Cluster Clients (Scheduler State)
+    clients_text = ""
+    for c in client_scheduler.stats():
+        state = f"⏸ FloodWait `{c['flood_wait']}s`" if c['flood_wait'] else "✅"
+        clients_text += (
+            f"• `{c['name']}` DC{c['dc_id']} {state} | "
+            f"Streams `{c['active_streams']}` | `{humanbytes(c['rate'])}/s` | Err `{c['errors']}`\n"
+        )
+
+    traffic_text = ""
+    for name, (c_ul, c_dl) in sorted(client_traffic.items()):
+        traffic_text += f"• `{name}`: ⬆️ `{humanbytes(c_ul)}` | ⬇️ `{humanbytes(c_dl)}`\n"
+
     stats_text = (
         f"🤖 **Streamer (Oracle) Stats**\n\n"
         f"⏳ **Uptime:** `{uptime}`\n"
         f"💻 **CPU:** `{cpu_per}%` | **RAM:** `{mem.percent}%`\n"
         f"💾 **Disk:** `{humanbytes(disk.free)}` Free\n\n"
 
-        f"☁️ **Telegram Cloud:** `{total_files}` Files\n\n"
+        f"☁️ **Telegram Cloud:** `{total_files}` Files\n"
+        f"🩺 **Replicas:** `{lh['locations']}` Tracked | 🩹 `{lh['dead']}` Dead (`/repair`)\n\n"
+
+        f"⚡ **File Cache:** `{fc['size']}` Docs | Hit `{fc['hits']}` / Miss `{fc['misses']}` ({fc['hit_ratio']:.0%})\n"
+        f"📨 **Msg Cache:** `{mc['size']}` Msgs | Hit `{mc['hits']}` / Miss `{mc['misses']}` ({mc['hit_ratio']:.0%})\n"
+        f"💽 **Chunk Cache:** `{humanbytes(cc['used_bytes'])}` / `{humanbytes(cc['max_bytes'])}` | 📌 `{cc['pinned']}` Pinned | Hit `{cc['hits']}` / Miss `{cc['misses']}` ({cc['hit_ratio']:.0%})\n"
+        f"🔗 **Shared Fetches:** `{sf['shared']}` | Ring Hit `{sf['ring_hits']}` | In-Flight `{sf['inflight']}`\n\n"
+
+        f"🤖 **Cluster Clients:**\n{clients_text}"
+        f"🔌 **Media Sessions:** `{ms['sessions']}` Warm | `{ms['failing']}` Reconnecting\n"
+        f"🚦 **Streams:** `{ad['active']}` Active | `{ad['waiting']}` Queued | "
+        f"Wait avg `{ad['avg_wait']:.1f}s` max `{ad['max_wait']:.1f}s` | 503 `{ad['rejected'] + ad['timed_out']}`\n\n"
 
         f"📡 **Traffic (Monthly):**\n"
         f"⬆️ **Streamed:** `{server_upload}`\n"
-        f"⬇️ **Download:** `{server_download}`"
+        f"⬇️ **Download:** `{server_download}`\n"
+        f"{traffic_text}"
     )
     
     await msg.edit(stats_text)
+
+# --- 🔥 TOP FILES (সবচেয়ে বেশি দেখা ফাইল) ---
+@Client.on_message(filters.command("top") & filters.user(Config.OWNER_ID))
+async def top_handler(bot, message):
+    try:
+        limit = min(50, max(1, int(message.command[1])))
+    except (IndexError, ValueError):
+        limit = 10
+
+    # DB এর হিসাব + এখনো flush না হওয়া লাইভ হিসাব
+    counts = {
+        doc['_id']: [doc.get('requests', 0), doc.get('bytes', 0)]
+        for doc in await db.get_top_files(limit)
+    }
+    for unique_id, requests, sent in popularity.live_top(limit):
+        entry = counts.setdefault(unique_id, [0, 0])
+        entry[0] += requests
+        entry[1] += sent
+
+    ranked = sorted(counts.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    if not ranked:
+        return await message.reply("📭 **No stream requests yet.**", quote=True)
+
+    files = await db.get_files([unique_id for unique_id, _ in ranked])
+    text = f"🔥 **Top {len(ranked)} Files**\n\n"
+    for i, (unique_id, (requests, sent)) in enumerate(ranked, 1):
+        name = (files.get(unique_id) or {}).get('file_name') or unique_id
+        text += f"**{i}.** `{name}`\n    👁 `{requests}` Requests | ⬆️ `{humanbytes(sent)}`\n"
+
+    await message.reply(text, quote=True)
+
+# --- 🩹 DEAD REPLICAS (মুছে যাওয়া কপি, আবার আপলোড/ফরোয়ার্ড দরকার) ---
+@Client.on_message(filters.command("repair") & filters.user(Config.OWNER_ID))
+async def repair_handler(bot, message):
+    try:
+        limit = min(50, max(1, int(message.command[1])))
+    except (IndexError, ValueError):
+        limit = 20
+
+    # আগে মেমরির রেকর্ড DB তে, যাতে এইমাত্র পাওয়া মৃত কপিও আসে
+    await location_health.flush()
+    files = await db.get_repair_files(limit)
+    if not files:
+        return await message.reply("✅ **No dead replicas found.**", quote=True)
+
+    text = f"🩹 **Files With Dead Replicas** (`{len(files)}`)\n\n"
+    for doc in files:
+        health = doc.get('location_health') or {}
+        dead = [key for key, record in health.items() if LocationRecord(record).dead]
+        alive = len(doc.get('locations', [])) - len(dead)
+        text += (
+            f"• `{doc.get('file_name') or doc['_id']}`\n"
+            f"    ❌ `{', '.join(dead)}` | ✅ `{alive}` Left\n"
+        )
+
+    await message.reply(text, quote=True)
@@ -0,0 +1,215 @@
+import time
+import asyncio
+from collections import deque, OrderedDict
+from bot.info import Config
+
+
+class Overloaded(Exception):
+    """Queue ভর্তি বা অপেক্ষার সময় শেষ → 503 Retry-After"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    __slots__ = ("ip", "client_name", "released")
+
+    def __init__(self, ip):
+        self.ip = ip
+        self.client_name = None
+        self.released = False
+
+
+class _Waiter:
+    __slots__ = ("ip", "clients", "future", "queued_at")
+
+    def __init__(self, ip, clients, future):
+        self.ip = ip
+        self.clients = clients
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+def client_ip(request):
+    """
+    ভিউয়ারের IP। X-Forwarded-For এর বাম দিকের এন্ট্রি ভিউয়ার নিজেই বানাতে পারে
+    (প্রতি রিকুয়েস্টে নতুন IP দিয়ে per-IP সীমা এড়ানো যায়), তাই ডান দিক থেকে
+    TRUSTED_PROXY_HOPS তম এন্ট্রি নেওয়া হয়: আমাদের প্রক্সি যেটা নিজে যোগ করেছে।
+    হেডার না থাকলে বা এন্ট্রি কম থাকলে কানেকশনের IP।
+    """
+    if Config.TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            hops = [ip.strip() for ip in forwarded.split(",") if ip.strip()]
+            if Config.TRUSTED_PROXY_HOPS <= len(hops):
+                return hops[-Config.TRUSTED_PROXY_HOPS]
+    return request.remote or "unknown"
+
+
+class AdmissionController:
+    """
+    Admission Control: global, per-IP আর per-session সমান্তরাল স্ট্রিমের সীমা।
+    সীমা পার হলে রিকুয়েস্ট একটা bounded fair queue তে অপেক্ষা করে (IP গুলোর মধ্যে
+    round-robin), timeout হলে বা queue ভর্তি থাকলে সাথে সাথে 503 Retry-After।
+    0 মানে সেই সীমা নেই।
+    """
+
+    def __init__(self, max_streams, max_per_ip, max_per_session, queue_size, queue_timeout, retry_after):
+        self.max_streams = max_streams
+        self.max_per_ip = max_per_ip
+        self.max_per_session = max_per_session
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.active = 0
+        self._ip_active = {}
+        self._session_active = {}
+        self._unbound = 0              # grant হয়েছে কিন্তু এখনো ক্লায়েন্ট বাছাই হয়নি
+        self._queues = OrderedDict()   # ip -> deque[_Waiter]
+        self.waiting = 0
+
+        # 📊 Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_total = 0.0
+        self.wait_count = 0
+        self.wait_max = 0.0
+
+    def session_has_room(self, client):
+        if not self.max_per_session:
+            return True
+        return self._session_active.get(client.name, 0) < self.max_per_session
+
+    def _session_room(self, clients):
+        if not self.max_per_session:
+            return 1 << 30
+        return sum(
+            max(0, self.max_per_session - self._session_active.get(c.name, 0))
+            for c in clients if c.is_connected
+        )
+
+    def _can_admit(self, ip, clients):
+        if self.max_streams and self.active >= self.max_streams:
+            return False
+        if self.max_per_ip and self._ip_active.get(ip, 0) >= self.max_per_ip:
+            return False
+        return self._session_room(clients) - self._unbound > 0
+
+    def _grant(self, ip):
+        self.active += 1
+        self._ip_active[ip] = self._ip_active.get(ip, 0) + 1
+        self._unbound += 1
+        self.admitted += 1
+        return Ticket(ip)
+
+    async def acquire(self, ip, clients):
+        # কেউ অপেক্ষায় না থাকলে আর জায়গা থাকলে সাথে সাথে
+        if not self.waiting and self._can_admit(ip, clients):
+            return self._grant(ip)
+
+        if self.waiting >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.retry_after)
+
+        waiter = _Waiter(ip, clients, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(ip, deque()).append(waiter)
+        self.waiting += 1
+        self.queued += 1
+        # অন্য IP এর সীমার কারণে queue আটকে থাকলে এই রিকুয়েস্ট এখনই যেতে পারে
+        self._wake()
+
+        try:
+            ticket = await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(waiter.future.result())  # grant এসেছিল, কিন্তু দেরিতে
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded(self.retry_after)
+            raise
+
+        waited = time.monotonic() - waiter.queued_at
+        self.wait_total += waited
+        self.wait_count += 1
+        self.wait_max = max(self.wait_max, waited)
+        return ticket
+
+    def _remove(self, waiter):
+        queue = self._queues.get(waiter.ip)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[waiter.ip]
+
+    def _wake(self):
+        """Round-robin: প্রতি পাসে প্রতিটি IP এর প্রথম জনকে সুযোগ"""
+        progressed = True
+        while progressed and self._queues:
+            progressed = False
+            for ip in list(self._queues):
+                queue = self._queues[ip]
+                waiter = queue[0]
+                if not self._can_admit(ip, waiter.clients):
+                    continue
+                queue.popleft()
+                self.waiting -= 1
+                if queue:
+                    self._queues.move_to_end(ip)
+                else:
+                    del self._queues[ip]
+                waiter.future.set_result(self._grant(ip))
+                progressed = True
+
+    def bind(self, ticket, client):
+        """স্ট্রিমের জন্য ক্লায়েন্ট বাছাই হলে per-session কাউন্টে যোগ"""
+        if ticket.released or ticket.client_name:
+            return
+        ticket.client_name = client.name
+        self._session_active[client.name] = self._session_active.get(client.name, 0) + 1
+        self._unbound -= 1
+
+    def release(self, ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        self.active -= 1
+        remaining = self._ip_active.get(ticket.ip, 1) - 1
+        if remaining > 0:
+            self._ip_active[ticket.ip] = remaining
+        else:
+            self._ip_active.pop(ticket.ip, None)
+        if ticket.client_name:
+            self._session_active[ticket.client_name] -= 1
+        else:
+            self._unbound -= 1
+        self._wake()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait": (self.wait_total / self.wait_count) if self.wait_count else 0.0,
+            "max_wait": self.wait_max,
+        }
+
+
+admission = AdmissionController(
+    max_streams=Config.MAX_STREAMS,
+    max_per_ip=Config.MAX_STREAMS_PER_IP,
+    max_per_session=Config.MAX_STREAMS_PER_SESSION,
+    queue_size=Config.STREAM_QUEUE_SIZE,
+    queue_timeout=Config.STREAM_QUEUE_TIMEOUT,
+    retry_after=Config.RETRY_AFTER
+)
@@ -0,0 +1,138 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class AsyncLRUCache:
+    """
+    Async-safe LRU + TTL cache.
+    maxsize: সর্বোচ্চ কতগুলো entry থাকবে (পুরনোগুলো আগে বাদ যাবে)
+    ttl: hit কত সেকেন্ড valid, negative_ttl: miss (None) কত সেকেন্ড valid
+    একই key-র জন্য একসাথে আসা miss গুলো একটাই loader call শেয়ার করে।
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, negative_ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}         # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+        # চলমান load এর রেজাল্ট পুরনো হতে পারে, তাই সেটা আর cache এ বসবে না
+        self._inflight.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+        self._inflight.clear()
+
+    async def get_or_load(self, key, loader):
+        """
+        Cache থেকে রিটার্ন করে, না থাকলে loader() কল করে।
+        Loader আলাদা task এ চলে, তাই কোনো একটা request cancel হলেও
+        বাকি অপেক্ষমাণ request গুলো রেজাল্ট পাবে।
+        """
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_loaded(key, t))
+        return await asyncio.shield(task)
+
+    async def get_many(self, keys, loader):
+        """
+        অনেকগুলো key একসাথে: cache এ না থাকা key গুলোর জন্য loader(missing) একবারই কল হয়
+        (রিটার্ন {key: value}, যেটা নেই সেটা None হিসেবে negative cache হয়)।
+        অন্য request এ load চলমান থাকলে সেটার সাথেই শেয়ার। রিটার্ন: {key: value}
+        """
+        results = {}
+        waiting = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                results[key] = value
+                continue
+            self.misses += 1
+            task = self._inflight.get(key)
+            if task is None:
+                missing.append(key)
+            else:
+                waiting[key] = task
+
+        if missing:
+            batch = asyncio.ensure_future(loader(missing))
+            for key in missing:
+                task = asyncio.ensure_future(self._pick(batch, key))
+                self._inflight[key] = task
+                task.add_done_callback(lambda t, key=key: self._on_loaded(key, t))
+                waiting[key] = task
+
+        if waiting:
+            values = await asyncio.shield(asyncio.gather(*waiting.values()))
+            results.update(zip(waiting, values))
+        return {key: results[key] for key in dict.fromkeys(keys)}
+
+    @staticmethod
+    async def _pick(batch, key):
+        return (await batch).get(key)
+
+    def _on_loaded(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            if not task.cancelled() and task.exception() is None:
+                self.set(key, task.result())
+        elif not task.cancelled():
+            task.exception()  # "exception was never retrieved" warning এড়াতে
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
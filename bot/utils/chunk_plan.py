@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+TG_CHUNK = 1024 * 1024  # 1MB Telegram Chunk Size
+
+# chunk_index: প্রথম চাঙ্কের index
+# first_part_cut: প্রথম চাঙ্কের শুরু থেকে কত বাইট বাদ
+# last_part_cut: শেষ চাঙ্কের কত বাইট পর্যন্ত রাখতে হবে
+# part_count: মোট কতগুলো চাঙ্ক লাগবে
+ChunkPlan = namedtuple("ChunkPlan", "chunk_index first_part_cut last_part_cut part_count")
+
+
+def plan_range(start, end, chunk_size=TG_CHUNK):
+    """
+    Inclusive byte range (start..end) → চাঙ্ক প্ল্যান।
+    শুধু যে চাঙ্কগুলোতে range এর বাইট আছে সেগুলোই আনা হয় (কখনো over-download না)।
+    """
+    if start < 0 or end < start:
+        raise ValueError(f"Invalid range {start}-{end}")
+    chunk_index = start // chunk_size
+    return ChunkPlan(
+        chunk_index=chunk_index,
+        first_part_cut=start % chunk_size,
+        last_part_cut=(end % chunk_size) + 1,
+        part_count=(end // chunk_size) - chunk_index + 1,
+    )
+
+
+def cut_chunk(chunk, position, first_part_cut, last_part_cut, part_count):
+    """
+    position তম চাঙ্ক (0 থেকে) থেকে range এর অংশটুকু কেটে রিটার্ন করা।
+    range একই চাঙ্কে শুরু ও শেষ হলে দুই দিকেই কাটা হয়।
+    memoryview দিয়ে কাটা হয়, তাই 1MB চাঙ্ক কপি হয় না।
+    """
+    lo = first_part_cut if position == 0 else 0
+    hi = last_part_cut if position == part_count - 1 else len(chunk)
+    if lo == 0 and hi >= len(chunk):
+        return chunk
+    return memoryview(chunk)[lo:hi]
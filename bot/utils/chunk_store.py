@@ -0,0 +1,236 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from bot.info import Config
+
+logger = logging.getLogger(__name__)
+
+PINS_FILE = "pinned.txt"
+# pin লিস্টের atomic write এর tmp (চাঙ্কের .tmp থেকে আলাদা, ক্যাশ রুটে থাকে)
+PINS_TMP_SUFFIX = ".pins-tmp"
+
+
+def _read_chunk(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_chunk(path, data, tmp_suffix=".tmp"):
+    """Atomic write: আগে .tmp ফাইলে লেখা, তারপর rename (ক্র্যাশ হলেও অর্ধেক চাঙ্ক থাকবে না)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}{tmp_suffix}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove_chunk(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_chunks(paths):
+    for path in paths:
+        _remove_chunk(path)
+
+
+class ChunkStore:
+    """
+    Hot ফাইলের জন্য লোকাল ডিস্ক চাঙ্ক ক্যাশ।
+    Key: (file unique_id, chunk_index), বাজেট: max_bytes, Eviction: LRU।
+    Cache hit হলে MTProto তে কোনো রিকুয়েস্ট যায় না।
+    সব স্ট্রিমের সব চাঙ্ক লেখা হয় না: শুধু popularity তে hot ফাইল আর pin করা চাঙ্ক।
+    একসাথে `max_pending` টার বেশি লেখা চললে নতুন লেখা বাদ যায়, ফাইল মোছা হয় executor এ।
+    """
+
+    def __init__(self, path, max_bytes, chunk_size=1024 * 1024, pin_bytes=0, max_pending=8):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_pending = max(1, max_pending)
+        self._hot = set()  # popularity থেকে: এই ফাইলগুলোর সব চাঙ্ক ক্যাশে ঢোকে
+        self._index = OrderedDict()  # (unique_id, index) -> size
+        # Pinned (নতুন ফাইলের head/moov চাঙ্ক): LRU eviction এ বাদ যায় না
+        # বাজেট ক্যাশের অর্ধেকের বেশি না, যাতে বাকি ক্যাশ কাজ করতে পারে
+        self.max_pinned = min(pin_bytes, max_bytes // 2) // chunk_size
+        self._pinned = OrderedDict()  # (unique_id, index) -> None
+        self._writing = set()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0  # pending লেখা ভর্তি থাকায় বাদ
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _chunk_path(self, unique_id, index):
+        return os.path.join(self.path, unique_id, f"{index}.chunk")
+
+    def load(self):
+        """স্টার্টআপে ডিস্ক স্ক্যান করে index তৈরি (পুরনো access আগে)"""
+        if not self.enabled or not os.path.isdir(self.path):
+            return
+        entries = []
+        for unique_id in os.listdir(self.path):
+            file_dir = os.path.join(self.path, unique_id)
+            if not os.path.isdir(file_dir):
+                if unique_id.endswith(PINS_TMP_SUFFIX):
+                    _remove_chunk(file_dir)  # ক্র্যাশের পর পড়ে থাকা pin লিস্টের tmp
+                continue
+            for name in os.listdir(file_dir):
+                full_path = os.path.join(file_dir, name)
+                if name.endswith(".tmp"):
+                    _remove_chunk(full_path)  # ক্র্যাশের পর পড়ে থাকা অর্ধেক লেখা ফাইল
+                    continue
+                if not name.endswith(".chunk"):
+                    continue
+                try:
+                    st = os.stat(full_path)
+                    index = int(name[:-len(".chunk")])
+                except (OSError, ValueError):
+                    continue
+                entries.append((st.st_atime, (unique_id, index), st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.used_bytes += size
+        self._load_pins()
+        _remove_chunks(self._evict())  # এখানে আগে থেকেই executor এ
+        logger.info(f"💽 Chunk Cache Loaded: {len(self._index)} chunks")
+
+    def _pins_path(self):
+        return os.path.join(self.path, PINS_FILE)
+
+    def _load_pins(self):
+        try:
+            with open(self._pins_path()) as f:
+                lines = f.read().split("\n")
+        except OSError:
+            return
+        for line in lines:
+            unique_id, _, index = line.partition(" ")
+            if index.isdigit() and (unique_id, int(index)) in self._index:
+                self.pin(unique_id, int(index))
+
+    def save(self):
+        """Pin লিস্ট ডিস্কে রাখা (restart এর পরেও head/moov চাঙ্ক pin থাকবে)"""
+        if not self.enabled:
+            return
+        data = "\n".join(f"{unique_id} {index}" for unique_id, index in self._pinned)
+        _write_chunk(self._pins_path(), data.encode(), tmp_suffix=PINS_TMP_SUFFIX)
+
+    def contains(self, unique_id, index):
+        return (unique_id, index) in self._index
+
+    def set_hot(self, unique_ids):
+        self._hot = set(unique_ids)
+
+    def wants(self, unique_id, index):
+        """চাঙ্কটা ক্যাশে রাখার মত কি না (hot ফাইল বা pin করা), ব্যাকগ্রাউন্ড লেখা শুরুর আগে"""
+        return self.enabled and (unique_id in self._hot or (unique_id, index) in self._pinned)
+
+    async def _remove(self, paths):
+        if paths:
+            await asyncio.get_running_loop().run_in_executor(None, _remove_chunks, paths)
+
+    async def get(self, unique_id, index):
+        key = (unique_id, index)
+        if key not in self._index:
+            self.misses += 1
+            return None
+        self._index.move_to_end(key)
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(None, _read_chunk, self._chunk_path(unique_id, index))
+        except OSError:
+            path = self._drop(key)
+            self.misses += 1
+            await self._remove([path] if path else [])
+            return None
+        self.hits += 1
+        return data
+
+    async def put(self, unique_id, index, data):
+        key = (unique_id, index)
+        if not self.wants(unique_id, index) or key in self._index or key in self._writing:
+            return
+        if len(data) > self.max_bytes:
+            return
+        if len(self._writing) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._writing.add(key)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, _write_chunk, self._chunk_path(unique_id, index), data)
+        except OSError as e:
+            logger.warning(f"Chunk Cache Write Error: {e}")
+            return
+        finally:
+            self._writing.discard(key)
+        self._index[key] = len(data)
+        self.used_bytes += len(data)
+        await self._remove(self._evict())
+
+    def pin(self, unique_id, index):
+        """
+        চাঙ্কটা eviction থেকে রক্ষা করা (এখনো লেখা শেষ না হলেও আগে থেকে pin করা যায়)।
+        Pin বাজেট ভরে গেলে সবচেয়ে পুরনো pin সাধারণ LRU চাঙ্ক হয়ে যায়।
+        """
+        if not self.max_pinned:
+            return
+        key = (unique_id, index)
+        self._pinned[key] = None
+        self._pinned.move_to_end(key)
+        while len(self._pinned) > self.max_pinned:
+            self._pinned.popitem(last=False)
+
+    def _drop(self, key):
+        """index থেকে বাদ; রিটার্ন: মুছতে হবে এমন চাঙ্ক ফাইলের path (না থাকলে None)"""
+        self._pinned.pop(key, None)
+        size = self._index.pop(key, None)
+        if size is None:
+            return None
+        self.used_bytes -= size
+        return self._chunk_path(*key)
+
+    def _evict(self):
+        """বাজেটের বাইরে গেলে LRU চাঙ্ক বাদ; রিটার্ন: মুছতে হবে এমন path গুলো"""
+        paths = []
+        if self.used_bytes <= self.max_bytes:
+            return paths
+        for key in list(self._index):
+            if self.used_bytes <= self.max_bytes:
+                break
+            if key not in self._pinned:
+                paths.append(self._drop(key))
+        return paths
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "chunks": len(self._index),
+            "pinned": len(self._pinned),
+            "hot_files": len(self._hot),
+            "writing": len(self._writing),
+            "dropped": self.dropped,
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+
+chunk_store = ChunkStore(
+    Config.CHUNK_CACHE_DIR,
+    Config.CHUNK_CACHE_MB * 1024 * 1024,
+    pin_bytes=Config.CHUNK_PIN_MB * 1024 * 1024,
+    max_pending=Config.CHUNK_CACHE_PENDING_WRITES
+)
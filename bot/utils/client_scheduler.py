@@ -0,0 +1,127 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+RATE_WINDOW = 5      # bytes/sec হিসাবের উইন্ডো (সেকেন্ড)
+ERROR_DECAY = 60     # এত সেকেন্ড পর পুরনো এরর আর স্কোরে ধরা হয় না
+
+
+class ClientState:
+    def __init__(self, client):
+        self.client = client
+        self.name = client.name
+        self.dc_id = None
+        self.active_streams = 0
+        self.total_bytes = 0
+        self.rate = 0.0            # bytes/sec (শেষ উইন্ডো)
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+        self.errors = 0            # সাম্প্রতিক এরর সংখ্যা
+        self.last_error = None
+        self.last_error_at = 0
+        self.flood_until = 0       # FloodWait শেষ হওয়ার সময় (monotonic)
+        self.flood_count = 0
+
+    def recent_errors(self, now):
+        if now - self.last_error_at > ERROR_DECAY:
+            self.errors = 0
+        return self.errors
+
+    def score(self, now, dc_id=None):
+        """ছোট স্কোর = ভালো ক্লায়েন্ট"""
+        dc_penalty = 1 if dc_id and self.dc_id and self.dc_id != dc_id else 0
+        return (self.active_streams, self.recent_errors(now), dc_penalty, self.rate)
+
+
+class ClientScheduler:
+    """
+    Load-aware ক্লায়েন্ট বাছাই (random.shuffle এর বদলে)।
+    প্রতিটি ক্লায়েন্টের active stream, bytes/sec, এরর, FloodWait আর DC ট্র্যাক করে।
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def state(self, client):
+        st = self._states.get(client.name)
+        if st is None:
+            st = self._states[client.name] = ClientState(client)
+        return st
+
+    async def register(self, client):
+        st = self.state(client)
+        try:
+            st.dc_id = await client.storage.dc_id()
+        except Exception as e:
+            logger.warning(f"DC lookup failed for {client.name}: {e}")
+
+    def candidates(self, clients, dc_id=None):
+        """
+        কম লোডের সুস্থ ক্লায়েন্টগুলো আগে (নতুন লিস্ট, আসল লিস্ট বদলায় না)।
+        FloodWait এ থাকা ক্লায়েন্টরা বাদ; সবাই FloodWait এ থাকলে যে আগে ফ্রি হবে সে আগে।
+        """
+        now = time.monotonic()
+        healthy = [c for c in clients if c.is_connected and self.state(c).flood_until <= now]
+        if healthy:
+            return sorted(healthy, key=lambda c: self.state(c).score(now, dc_id))
+        return sorted(clients, key=lambda c: self.state(c).flood_until)
+
+    def benched_for(self, client):
+        """FloodWait এর আর কত সেকেন্ড বাকি (0 = ফ্রি)"""
+        return max(0, self.state(client).flood_until - time.monotonic())
+
+    # --- 📈 Stream Events ---
+    def stream_started(self, client):
+        self.state(client).active_streams += 1
+
+    def stream_finished(self, client):
+        st = self.state(client)
+        st.active_streams = max(0, st.active_streams - 1)
+
+    def record_bytes(self, client, size):
+        st = self.state(client)
+        st.total_bytes += size
+        st._window_bytes += size
+        now = time.monotonic()
+        elapsed = now - st._window_start
+        if elapsed >= RATE_WINDOW:
+            st.rate = st._window_bytes / elapsed
+            st._window_bytes = 0
+            st._window_start = now
+
+    def record_flood(self, client, seconds):
+        st = self.state(client)
+        st.flood_until = max(st.flood_until, time.monotonic() + seconds)
+        st.flood_count += 1
+        self.record_error(client, f"FloodWait {seconds}s")
+
+    def record_error(self, client, error):
+        st = self.state(client)
+        now = time.monotonic()
+        st.recent_errors(now)
+        st.errors += 1
+        st.last_error = str(error)
+        st.last_error_at = now
+
+    def stats(self):
+        now = time.monotonic()
+        rows = []
+        for st in self._states.values():
+            # অনেকক্ষণ ট্রাফিক না থাকলে পুরনো rate দেখানো হবে না
+            rate = st.rate if now - st._window_start < RATE_WINDOW * 2 else 0.0
+            rows.append({
+                "name": st.name,
+                "dc_id": st.dc_id,
+                "active_streams": st.active_streams,
+                "rate": rate,
+                "total_bytes": st.total_bytes,
+                "errors": st.recent_errors(now),
+                "last_error": st.last_error,
+                "flood_wait": max(0, int(st.flood_until - now)),
+                "flood_count": st.flood_count,
+            })
+        return rows
+
+
+client_scheduler = ClientScheduler()
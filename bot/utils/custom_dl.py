@@ -1,46 +1,389 @@
+import time
 import logging
 import asyncio
+from collections import deque, OrderedDict
+from pyrogram import raw
+from pyrogram.file_id import FileId, FileType, FileUniqueId, FileUniqueType
 from pyrogram.errors import FloodWait
+from bot.info import Config
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.chunk_store import chunk_store
+from bot.utils.media_sessions import media_sessions
+from bot.utils.chunk_plan import TG_CHUNK, cut_chunk
+from bot.utils.metrics import chunk_fetch
+from bot.utils.traffic import traffic
+
+# ব্যাকগ্রাউন্ড task (ক্যাশে লেখা) যেন GC তে হারিয়ে না যায়
+_background_tasks = set()
+
+
+def _spawn(coro):
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _discard(tasks):
+    """চলমান task বাতিল, শেষ হওয়া task এর exception 'retrieved' মার্ক করা"""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class ChunkFlights:
+    """
+    Single-flight: একই (file, chunk_index) এর জন্য একসাথে আসা রিকুয়েস্টগুলো
+    একটাই Telegram ডাউনলোড শেয়ার করে। সাম্প্রতিক চাঙ্কগুলো ছোট একটা মেমরি রিং এ থাকে,
+    যাতে একটু পিছিয়ে থাকা ভিউয়ারও সেটা পায়। কোনো ভিউয়ার ধীর হলে সে শুধু নিজের
+    read-ahead window এ আটকায়, বাকিদের আটকায় না; রিং থেকে বাদ পড়লে নিজেই আবার আনে।
+    """
+
+    def __init__(self, ring_size):
+        self.ring_size = ring_size
+        self._inflight = {}
+        self._ring = OrderedDict()
+        self.shared = 0
+        self.ring_hits = 0
+
+    async def get(self, key, fetch):
+        chunk = self._ring.get(key)
+        if chunk is not None:
+            self._ring.move_to_end(key)
+            self.ring_hits += 1
+            return chunk
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight(asyncio.ensure_future(fetch()))
+            flight.task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            # কেউ আর অপেক্ষা না করলে (সবাই ডিসকানেক্ট) ডাউনলোড বাতিল।
+            # key টা এখনই সরানো হয় (_on_done পরে চলে), নাহলে মাঝের সময়ে আসা
+            # ভিউয়ার বাতিল হওয়া task পেয়ে CancelledError খাবে
+            if flight.waiters == 0 and not flight.task.done():
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                flight.task.cancel()
+
+    def _on_done(self, key, task):
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        chunk = task.result()
+        if chunk and self.ring_size > 0:
+            self._ring[key] = chunk
+            while len(self._ring) > self.ring_size:
+                self._ring.popitem(last=False)
+
+    def stats(self):
+        return {
+            "inflight": len(self._inflight),
+            "ring": len(self._ring),
+            "shared": self.shared,
+            "ring_hits": self.ring_hits,
+        }
+
+
+chunk_flights = ChunkFlights(Config.CHUNK_RING_SIZE)
+
+
+class BufferBudget:
+    """
+    সব স্ট্রিম মিলিয়ে read-ahead এ সর্বোচ্চ কতগুলো চাঙ্ক বাফার মেমরিতে থাকবে।
+    বাজেট শেষ হলে স্ট্রিমগুলো read-ahead ছাড়া (একটা একটা চাঙ্ক) চলে, তাই
+    ৫০০ স্ট্রিমেও RSS মোটামুটি স্থির থাকে আর কোনো স্ট্রিম আটকে যায় না।
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.in_use = 0
+
+    def try_acquire(self):
+        if self.in_use < self.slots:
+            self.in_use += 1
+            return True
+        return False
+
+    def release(self):
+        self.in_use = max(0, self.in_use - 1)
+
+
+buffer_budget = BufferBudget(Config.STREAM_BUFFER_SLOTS)
+
+
+class CdnRedirect(Exception):
+    """upload.GetFile CDN এ পাঠালে (তখন Pyrogram এর stream_media দিয়ে চালানো হয়)"""
+
+
+class ChunkSource:
+    """
+    একটি ক্লায়েন্ট + সেই ক্লায়েন্টের নিজস্ব file_id (একই মেসেজ, কিন্তু আলাদা file reference)
+    """
+    def __init__(self, streamer, file_id):
+        self.streamer = streamer
+        self.file_id = file_id
+        self.file_id_obj = FileId.decode(file_id)
+        self.location = ByteStreamer.get_location(self.file_id_obj)
+        # সব ক্লায়েন্টের জন্য একই (DB এর _id এর মতো), ডিস্ক ক্যাশের key
+        self.unique_id = FileUniqueId(
+            file_unique_type=FileUniqueType.DOCUMENT,
+            media_id=self.file_id_obj.media_id
+        ).encode()
+        self.session = None
+
+    @property
+    def client(self):
+        return self.streamer.client
+
+    async def fetch(self, index, chunk_size):
+        try:
+            if self.session is None:
+                self.session = await self.streamer.generate_media_session(self.file_id_obj)
+            started = time.monotonic()
+            chunk = await ByteStreamer.get_chunk(self.session, self.location, index, chunk_size)
+            chunk_fetch.observe(time.monotonic() - started, self.client.name)
+        except FloodWait as e:
+            client_scheduler.record_flood(self.client, e.value)
+            raise
+        except (CdnRedirect, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            client_scheduler.record_error(self.client, e)
+            raise
+        client_scheduler.record_bytes(self.client, len(chunk))
+        traffic.received(self.unique_id, self.client.name, len(chunk))
+        return chunk
+
+
+class SourceSet:
+    """
+    একটি স্ট্রিমের সব ChunkSource।
+    সবাই FloodWait এ থাকলে resolver দিয়ে অন্য ক্লাস্টার ক্লায়েন্ট (তার নিজের file_id সহ)
+    যোগ করা হয়, আর স্ট্রিম ঠিক সেই চাঙ্ক থেকে নতুন ক্লায়েন্টে চলতে থাকে।
+    """
+
+    def __init__(self, sources, resolver=None, striped=False):
+        self.sources = sources
+        self.resolver = resolver
+        self.striped = striped
+        self.unique_id = sources[0].unique_id
+        self._expanding = None
+
+    async def expand(self):
+        """নতুন ক্লায়েন্ট যোগ হলে True"""
+        if self.resolver is None:
+            return False
+        if self._expanding is None or self._expanding.done():
+            self._expanding = asyncio.ensure_future(self._expand())
+        return await asyncio.shield(self._expanding)
+
+    async def _expand(self):
+        known = {source.client.name for source in self.sources}
+        try:
+            extra = await self.resolver(known)
+        except Exception as e:
+            logging.warning(f"Handoff Resolve Failed: {e}")
+            return False
+
+        added = False
+        prefetch = self.sources[0].streamer.prefetch
+        for client, file_id in extra:
+            if client.name in known:
+                continue
+            self.sources.append(ChunkSource(ByteStreamer(client, prefetch), file_id))
+            client_scheduler.stream_started(client)
+            known.add(client.name)
+            added = True
+        return added
+
 
 class ByteStreamer:
-    def __init__(self, client):
+    def __init__(self, client, prefetch=None):
         self.client = client
+        # Read-ahead window: একসাথে কতগুলো চাঙ্ক রিকুয়েস্ট চলবে
+        self.prefetch = max(1, prefetch or Config.PREFETCH_CHUNKS)
+
+    @staticmethod
+    def get_location(file_id: FileId):
+        if file_id.file_type == FileType.PHOTO:
+            return raw.types.InputPhotoFileLocation(
+                id=file_id.media_id,
+                access_hash=file_id.access_hash,
+                file_reference=file_id.file_reference,
+                thumb_size=file_id.thumbnail_size
+            )
+        return raw.types.InputDocumentFileLocation(
+            id=file_id.media_id,
+            access_hash=file_id.access_hash,
+            file_reference=file_id.file_reference,
+            thumb_size=file_id.thumbnail_size
+        )
+
+    async def generate_media_session(self, file_id: FileId):
+        """
+        ফাইলের DC এর জন্য warm media session (MediaSessionPool থেকে)।
+        স্টার্টআপেই তৈরি থাকে, তাই স্ট্রিমের শুরুতে DC handshake লাগে না।
+        """
+        return await media_sessions.get(self.client, file_id.dc_id)
+
+    @staticmethod
+    async def get_chunk(session, location, index, chunk_size):
+        """একটি চাঙ্ক (index তম) upload.GetFile দিয়ে আনা"""
+        r = await session.invoke(
+            raw.functions.upload.GetFile(
+                location=location,
+                offset=index * chunk_size,
+                limit=chunk_size
+            ),
+            sleep_threshold=0 # FloodWait এ ঘুমিয়ে না থেকে অন্য ক্লায়েন্টে চলে যাওয়া হবে
+        )
+        if isinstance(r, raw.types.upload.FileCdnRedirect):
+            raise CdnRedirect()
+        return r.bytes
+
+    @staticmethod
+    async def fetch_striped(source_set, index, chunk_size):
+        """
+        Striping: index তম চাঙ্ক sources[index % n] থেকে আনা হয় (striped না হলে প্রথম সুস্থ সোর্স থেকে)।
+        কোনো ক্লায়েন্ট FloodWait খেলে scheduler তাকে ওয়েট শেষ না হওয়া পর্যন্ত
+        বেঞ্চে রাখে, আর পরের ক্লায়েন্ট দিয়ে ঠিক একই চাঙ্ক আনা হয়।
+        """
+        while True:
+            sources = list(source_set.sources)
+            first = index % len(sources) if source_set.striped else 0
+            for k in range(len(sources)):
+                source = sources[(first + k) % len(sources)]
+                if client_scheduler.benched_for(source.client):
+                    continue
+                try:
+                    return await source.fetch(index, chunk_size)
+                except FloodWait as e:
+                    logging.warning(f"⚠️ FloodWait {e.value}s on {source.client.name}, switching client...")
 
-    async def yield_file(self, file_id, index, first_part_cut, last_part_cut, part_count, chunk_size=1024 * 1024):
+            # সব ক্লায়েন্ট FloodWait এ: নতুন ক্লায়েন্টে handoff, না পেলে যেটা আগে ফ্রি হবে তার জন্য অপেক্ষা
+            if await source_set.expand():
+                continue
+            await asyncio.sleep(max(1, min(client_scheduler.benched_for(s.client) for s in source_set.sources)))
+
+    @classmethod
+    async def fetch_shared(cls, source_set, index, chunk_size):
+        """একই চাঙ্ক অন্য কোনো স্ট্রিম আনছে থাকলে সেটার সাথেই শেয়ার করা"""
+        key = (source_set.unique_id, index, chunk_size)
+        return await chunk_flights.get(key, lambda: cls.fetch_cached(source_set, index, chunk_size))
+
+    @classmethod
+    async def fetch_cached(cls, source_set, index, chunk_size):
+        """ডিস্ক ক্যাশে থাকলে সেখান থেকে, না থাকলে Telegram থেকে এনে (hot/pin হলে) ক্যাশে রাখা"""
+        use_store = chunk_store.enabled and chunk_size == chunk_store.chunk_size
+        unique_id = source_set.unique_id
+        if use_store:
+            chunk = await chunk_store.get(unique_id, index)
+            if chunk is not None:
+                return chunk
+
+        chunk = await cls.fetch_striped(source_set, index, chunk_size)
+        if use_store and chunk and chunk_store.wants(unique_id, index):
+            _spawn(chunk_store.put(unique_id, index, chunk))
+        return chunk
+
+    async def _fetch_chunks(self, file_id, index, part_count, chunk_size, peers=(), resolver=None):
+        """
+        Read-ahead pipeline: প্রতি ক্লায়েন্টে সবসময় `prefetch` টা রিকুয়েস্ট চলমান রাখে,
+        কিন্তু চাঙ্ক গুলো ক্রমানুসারে (in order) yield করে।
+        """
+        sources = [ChunkSource(self, file_id)]
+        sources += [ChunkSource(ByteStreamer(client, self.prefetch), peer_file_id) for client, peer_file_id in peers]
+        source_set = SourceSet(sources, resolver=resolver, striped=bool(peers))
+        window = self.prefetch * len(sources)
+
+        pending = deque()   # (task, buffer slot নেওয়া হয়েছে কি না)
+        next_index = index
+        end_index = index + part_count
+        for source in sources:
+            client_scheduler.stream_started(source.client)
+        try:
+            while pending or next_index < end_index:
+                while next_index < end_index and len(pending) < window:
+                    # পরের (in-order) চাঙ্ক সবসময় আনা হয়, read-ahead শুধু বাফার বাজেট থাকলে
+                    has_slot = bool(pending)
+                    if has_slot and not buffer_budget.try_acquire():
+                        break
+                    pending.append((asyncio.ensure_future(
+                        self.fetch_shared(source_set, next_index, chunk_size)
+                    ), has_slot))
+                    next_index += 1
+
+                task, has_slot = pending[0]
+                try:
+                    chunk = await task
+                except CdnRedirect:
+                    # CDN ফাইল: বাকিটা Pyrogram এর নিজস্ব (sequential) পদ্ধতিতে
+                    remaining = end_index - index
+                    async for chunk in self.client.stream_media(file_id, limit=remaining, offset=index):
+                        yield chunk
+                    return
+                pending.popleft()
+
+                try:
+                    yield chunk
+                finally:
+                    # চাঙ্ক সকেটে লেখা শেষ (বা স্ট্রিম বন্ধ) → বাফার স্লট ফেরত
+                    if has_slot:
+                        buffer_budget.release()
+                if len(chunk) < chunk_size:
+                    break  # ফাইলের শেষ
+                index += 1
+        finally:
+            # ক্লায়েন্ট ডিসকানেক্ট হলে বা শেষ হলে চলমান রিকুয়েস্টগুলো বাতিল
+            _discard(task for task, _ in pending)
+            for _, has_slot in pending:
+                if has_slot:
+                    buffer_budget.release()
+            for source in source_set.sources:
+                client_scheduler.stream_finished(source.client)
+
+    async def yield_file(self, file_id, index, first_part_cut, last_part_cut, part_count, chunk_size=TG_CHUNK, peers=(), resolver=None):
         """
         FileStreamBot Style Yielding
         index: কত তম চাঙ্ক থেকে শুরু হবে
         part_count: মোট কতগুলো চাঙ্ক লাগবে
+        peers: [(client, file_id), ...] - Striped mode এ অন্য ক্লায়েন্টগুলো (একই মেসেজ)
+        resolver: FloodWait এ handoff এর জন্য অন্য ক্লায়েন্ট খোঁজার async ফাংশন
         """
-        client = self.client
-        
+        # এরর এখানে গিলে ফেলা হয় না: caller (stream_helper) ঠিক পরের বাইট থেকে resume করে
+        chunks = self._fetch_chunks(file_id, index, part_count, chunk_size, peers, resolver)
         try:
-            async for chunk in client.stream_media(
-                file_id,
-                limit=part_count,
-                offset=index,
-            ):
+            position = 0
+            async for chunk in chunks:
                 if not chunk:
                     break
-                
-                # প্রথম চাঙ্ক প্রসেসিং (Cutting logic)
-                if first_part_cut:
-                    yield chunk[first_part_cut:]
-                    first_part_cut = 0 # একবার কাটার পর আর কাটার দরকার নেই
-                
-                # শেষ চাঙ্ক প্রসেসিং
-                elif last_part_cut and part_count == 1:
-                    yield chunk[:last_part_cut]
+
+                # Cutting logic: প্রথম চাঙ্কের শুরু আর শেষ চাঙ্কের শেষ কাটা
+                # (range একই চাঙ্কে শুরু ও শেষ হলে দুই দিকেই)
+                yield cut_chunk(chunk, position, first_part_cut, last_part_cut, part_count)
+
+                position += 1
+                if position >= part_count:
                     break
-                
-                # সাধারণ চাঙ্ক
-                else:
-                    yield chunk
-                
-                part_count -= 1
-                
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
-        except Exception as e:
-            logging.error(f"ByteStreamer Error: {e}")
-            pass
+        finally:
+            await chunks.aclose()
@@ -1,7 +1,14 @@
 import motor.motor_asyncio
+import asyncio
+import logging
 import datetime
 from bot.info import Config
 from pyrogram.types import Message
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from bot.utils.cache import AsyncLRUCache
+
+logger = logging.getLogger(__name__)
 
 class Database:
     def __init__(self, uri, database_name):
@@ -9,6 +16,21 @@ class Database:
         self.db = self._client[database_name]
         self.col = self.db[Config.COLLECTION_NAME]
         self.config_col = self.db['bot_settings'] 
+        self.popularity_col = self.db['popularity']
+
+        # 🔐 Auth Cache (load_auth দিয়ে লোড হয়)
+        self.auth_users = None
+        self.auth_version = None
+
+        # 🆕 নতুন ফাইল upsert হলে যাদের জানাতে হবে (যেমন head/moov warm-up)
+        self._new_file_hooks = []
+
+        # ⚡ File Metadata Cache (Stream/API রিকুয়েস্টে বারবার Mongo কল না করার জন্য)
+        self.file_cache = AsyncLRUCache(
+            maxsize=Config.FILE_CACHE_SIZE,
+            ttl=Config.FILE_CACHE_TTL,
+            negative_ttl=Config.FILE_CACHE_NEG_TTL
+        )
 
     def new_user(self, id):
         return dict(
@@ -17,38 +39,111 @@ class Database:
         )
 
     # --- 🔥 ADD FILE (Global) ---
-    async def add_file(self, media_msg: Message, file_id: str, unique_id: str):
+    @staticmethod
+    def _file_fields(media_msg: Message, file_id: str):
         media = getattr(media_msg, media_msg.media.value)
-        file_name = getattr(media, 'file_name', 'Unknown')
-        file_size = getattr(media, 'file_size', 0)
-        mime_type = getattr(media, 'mime_type', 'None')
-        caption = media_msg.caption or ""
+        return {
+            'file_id': file_id,
+            'file_name': getattr(media, 'file_name', 'Unknown'),
+            'file_size': getattr(media, 'file_size', 0),
+            'mime_type': getattr(media, 'mime_type', 'None'),
+            'caption': media_msg.caption or ""
+        }
 
-        await self.col.update_one(
+    async def add_file(self, media_msg: Message, file_id: str, unique_id: str):
+        fields = self._file_fields(media_msg, file_id)
+        new_loc = {'chat_id': media_msg.chat.id, 'message_id': media_msg.id}
+
+        # একটাই atomic upsert: মেটাডাটা + লোকেশন একসাথে
+        result = await self.col.update_one(
             {'_id': unique_id},
-            {
-                '$set': {
-                    'file_id': file_id,
-                    'file_name': file_name,
-                    'file_size': file_size,
-                    'mime_type': mime_type,
-                    'caption': caption
-                }
-            },
+            {'$set': fields, '$addToSet': {'locations': new_loc}},
             upsert=True
         )
+        self.file_cache.invalidate(unique_id)
 
-        new_loc = {'chat_id': media_msg.chat.id, 'message_id': media_msg.id}
-        await self.col.update_one(
-            {'_id': unique_id},
-            {'$addToSet': {'locations': new_loc}}
-        )
+        if result.upserted_id is not None:
+            await self._count_new_files(1, fields['file_size'] or 0)
+            for hook in self._new_file_hooks:
+                hook(unique_id)
+
+    async def add_files_bulk(self, media_msgs, notify=False):
+        """
+        অনেকগুলো মিডিয়া মেসেজ একটাই unordered bulk_write এ (চ্যানেল backfill এর জন্য)।
+        একই ফাইলের একাধিক কপি (ভিন্ন চ্যানেল) একটা upsert এ সব লোকেশন সহ যায়।
+        notify=False: পুরনো ফাইল backfill এ new-file hook (warm-up) চলে না।
+        রিটার্ন: (মোট ফাইল, নতুন ফাইল)
+        """
+        grouped = {}  # unique_id -> (fields, [locations])
+        for media_msg in media_msgs:
+            media = getattr(media_msg, media_msg.media.value, None) if media_msg.media else None
+            if media is None:
+                continue
+            entry = grouped.get(media.file_unique_id)
+            if entry is None:
+                entry = grouped[media.file_unique_id] = (self._file_fields(media_msg, media.file_id), [])
+            loc = {'chat_id': media_msg.chat.id, 'message_id': media_msg.id}
+            if loc not in entry[1]:
+                entry[1].append(loc)
+        if not grouped:
+            return 0, 0
+
+        unique_ids = list(grouped)
+        try:
+            result = await self.col.bulk_write([
+                UpdateOne(
+                    {'_id': unique_id},
+                    {'$set': grouped[unique_id][0], '$addToSet': {'locations': {'$each': grouped[unique_id][1]}}},
+                    upsert=True
+                )
+                for unique_id in unique_ids
+            ], ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            # unordered: বাকি গুলো লেখা হয়ে গেছে, শুধু ফেল করা গুলো বাদ
+            upserted = {u['index']: u['_id'] for u in e.details.get('upserted', [])}
+            logger.warning(f"Bulk Add: {len(e.details.get('writeErrors', []))} of {len(unique_ids)} failed")
+
+        for unique_id in unique_ids:
+            self.file_cache.invalidate(unique_id)
+
+        new_ids = [unique_ids[i] for i in upserted]
+        if new_ids:
+            await self._count_new_files(
+                len(new_ids), sum(grouped[uid][0]['file_size'] or 0 for uid in new_ids)
+            )
+            if notify:
+                for unique_id in new_ids:
+                    for hook in self._new_file_hooks:
+                        hook(unique_id)
+        return len(unique_ids), len(new_ids)
+
+    def on_new_file(self, hook):
+        """hook(unique_id): add_file এ নতুন ডকুমেন্ট তৈরি হলে কল হবে (sync, দ্রুত হতে হবে)"""
+        self._new_file_hooks.append(hook)
 
     async def get_file(self, unique_id: str):
-        return await self.col.find_one({'_id': unique_id})
+        # ⚠️ রিটার্ন করা dict টা cache এর সাথে শেয়ার করা, তাই এটা মডিফাই করবেন না
+        return await self.file_cache.get_or_load(
+            unique_id, lambda: self.col.find_one({'_id': unique_id})
+        )
+
+    async def get_files(self, unique_ids):
+        """
+        একাধিক ফাইল: cache এ না থাকা গুলো একটাই `$in` কুয়েরিতে।
+        রিটার্ন: {unique_id: doc বা None} (রিকুয়েস্টের ক্রমে)
+        """
+        async def load(missing):
+            docs = {}
+            async for doc in self.col.find({'_id': {'$in': missing}}):
+                docs[doc['_id']] = doc
+            return docs
+
+        return await self.file_cache.get_many(unique_ids, load)
 
     async def get_total_files_count(self):
-        return await self.col.count_documents({})
+        files, _ = await self.get_total_storage()
+        return files
 
     # --- 📊 MAIN BOT BANDWIDTH (Heroku) ---
     # এই ফাংশনগুলো মেইন বটের জন্য (যা আগে থেকেই ছিল)
@@ -95,6 +190,43 @@ class Database:
             upsert=True
         )
 
+    async def add_client_traffic(self, clients):
+        """মাসিক মোট আর ক্লায়েন্ট অনুযায়ী হিসাব একটাই `$inc` এ। clients: {name: [sent, received]}"""
+        inc = {'upload': 0, 'download': 0}
+        for name, (sent, received) in clients.items():
+            inc['upload'] += sent
+            inc['download'] += received
+            inc[f'clients.{name}.upload'] = sent
+            inc[f'clients.{name}.download'] = received
+        await self.config_col.update_one({'_id': 'streamer_bandwidth'}, {'$inc': inc}, upsert=True)
+
+    async def add_file_traffic(self, files):
+        """
+        ফাইল অনুযায়ী (lifetime) হিসাব একটাই unordered bulk write এ। files: {unique_id: [sent, received]}
+        রিটার্ন: যেগুলো লেখা যায়নি (বাকিগুলো লেখা হয়ে গেছে, আবার যোগ করলে দুইবার গোনা হবে)
+        """
+        if not files:
+            return {}
+        unique_ids = list(files)
+        try:
+            await self.col.bulk_write([
+                UpdateOne(
+                    {'_id': unique_id},
+                    {'$inc': {'traffic.sent': files[unique_id][0], 'traffic.received': files[unique_id][1]}}
+                )
+                for unique_id in unique_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            failed = {unique_ids[err['index']] for err in e.details.get('writeErrors', [])}
+            return {unique_id: files[unique_id] for unique_id in failed}
+        return {}
+
+    async def get_streamer_clients(self):
+        """এই মাসে ক্লায়েন্ট অনুযায়ী {name: (upload, download)}"""
+        data = await self.config_col.find_one({'_id': 'streamer_bandwidth'}, {'clients': 1})
+        clients = (data or {}).get('clients', {})
+        return {name: (v.get('upload', 0), v.get('download', 0)) for name, v in clients.items()}
+
     async def get_streamer_bandwidth(self):
         data = await self.config_col.find_one({'_id': 'streamer_bandwidth'})
         if not data:
@@ -117,43 +249,231 @@ class Database:
         if data.get('last_reset') != current_month:
             await self.config_col.update_one(
                 {'_id': 'streamer_bandwidth'},
-                {'$set': {'upload': 0, 'download': 0, 'last_reset': current_month}}
+                {'$set': {'upload': 0, 'download': 0, 'clients': {}, 'last_reset': current_month}}
             )
 
+    # --- 🔥 POPULARITY (Hot Files) ---
+    async def add_popularity(self, counts):
+        """counts: {unique_id: (requests, bytes)} → একটাই unordered bulk `$inc`"""
+        now = datetime.datetime.utcnow()
+        await self.popularity_col.bulk_write([
+            UpdateOne(
+                {'_id': unique_id},
+                {'$inc': {'requests': requests, 'bytes': sent}, '$set': {'last_seen': now}},
+                upsert=True
+            )
+            for unique_id, (requests, sent) in counts.items()
+        ], ordered=False)
+
+    async def get_top_files(self, limit):
+        cursor = self.popularity_col.find().sort('requests', -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
     # --- 💾 TOTAL STORAGE ---
-    async def get_total_storage(self):
-        pipeline = [{"$group": {"_id": None, "total_size": {"$sum": "$file_size"}}}]
-        cursor = self.col.aggregate(pipeline)
-        result = await cursor.to_list(length=1)
-        total_bytes = result[0]['total_size'] if result else 0
-        total_files = await self.col.count_documents({})
-        return total_files, total_bytes
+    # প্রতি /stats এ পুরো কালেকশন aggregate না করে add_file এ মেইনটেইন করা কাউন্টার
+    async def recount_storage(self):
+        """
+        পুরো কালেকশন গুনে কাউন্টার নতুন করে লেখা (migration আর পিরিয়ডিক repair)।
+        add_file এর `$inc` শুধু এই নোডের insert ধরে; মেইন বটের insert আর delete এখানে ঠিক হয়।
+        """
+        pipeline = [{"$group": {"_id": None, "files": {"$sum": 1}, "bytes": {"$sum": "$file_size"}}}]
+        result = await self.col.aggregate(pipeline).to_list(length=1)
+        files = result[0]['files'] if result else 0
+        total_bytes = result[0]['bytes'] if result else 0
+        await self.config_col.update_one(
+            {'_id': 'storage_stats'},
+            {'$set': {'files': files, 'bytes': total_bytes}},
+            upsert=True
+        )
+        return files, total_bytes
 
-    # --- 🔐 AUTH SYSTEM ---
-    async def add_auth_user(self, user_id):
+    async def _count_new_files(self, files, total_bytes):
         await self.config_col.update_one(
-            {'_id': 'auth_list'},
-            {'$addToSet': {'users': int(user_id)}},
+            {'_id': 'storage_stats'},
+            {'$inc': {'files': files, 'bytes': total_bytes}},
             upsert=True
         )
 
-    async def remove_auth_user(self, user_id):
+    async def get_total_storage(self):
+        data = await self.config_col.find_one({'_id': 'storage_stats'})
+        if not data:
+            return await self.recount_storage()
+        return data.get('files', 0), data.get('bytes', 0)
+
+    # --- 🩺 LOCATION HEALTH ---
+    async def save_location_health(self, updates, needs_repair):
+        """
+        updates: {unique_id: {location key: record}} → একটাই unordered bulk write।
+        needs_repair: যেসব ফাইলের মৃত কপি আছে; বাকিগুলো থেকে `needs_repair` মুছে ফেলা হয়
+        (False লিখলে sparse index এ সব ডকুমেন্ট ঢুকে যায়)
+        """
+        if not updates:
+            return
+        requests = []
+        for unique_id, health in updates.items():
+            if unique_id in needs_repair:
+                update = {'$set': {'location_health': health, 'needs_repair': True}}
+            else:
+                update = {'$set': {'location_health': health}, '$unset': {'needs_repair': ""}}
+            requests.append(UpdateOne({'_id': unique_id}, update))
+        await self.col.bulk_write(requests, ordered=False)
+        for unique_id in updates:
+            self.file_cache.invalidate(unique_id)
+
+    async def get_repair_files(self, limit):
+        """যেসব ফাইলের অন্তত একটা কপি মুছে গেছে"""
+        cursor = self.col.find(
+            {'needs_repair': True}, {'file_name': 1, 'locations': 1, 'location_health': 1}
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # --- 📇 INDEXER CHECKPOINTS ---
+    async def get_index_checkpoints(self):
+        """
+        ({chat_id: যে message id পর্যন্ত ইনডেক্স শেষ}, {যেসব চ্যানেল অন্তত একবার পুরো স্ক্যান হয়েছে})
+        """
+        data = await self.config_col.find_one({'_id': 'indexer'}) or {}
+        checkpoints = {int(chat_id): last_id for chat_id, last_id in data.get('channels', {}).items()}
+        return checkpoints, set(data.get('complete', []))
+
+    async def mark_index_complete(self, chat_id):
+        await self.config_col.update_one({'_id': 'indexer'}, {'$addToSet': {'complete': chat_id}}, upsert=True)
+
+    async def save_index_checkpoint(self, chat_id, last_id):
+        # $max: একসাথে কয়েকটা worker লিখলেও checkpoint পিছিয়ে যায় না
         await self.config_col.update_one(
-            {'_id': 'auth_list'},
-            {'$pull': {'users': int(user_id)}}
+            {'_id': 'indexer'}, {'$max': {f'channels.{chat_id}': last_id}}, upsert=True
+        )
+
+    async def reset_index_checkpoints(self):
+        await self.config_col.delete_one({'_id': 'indexer'})
+
+    # --- 🛠️ MIGRATIONS & QUERY AUDIT ---
+    async def ensure_indexes(self):
+        """
+        স্টার্টআপ migration: দরকারি index গুলো (আগে থেকে থাকলে কিছু হয় না)।
+        শুধু যেগুলো কোনো query সত্যিই ব্যবহার করে; বাকি সব lookup `_id` দিয়ে, আর প্রতিটা index
+        add_file/add_files_bulk এর write খরচ বাড়ায়
+        """
+        await self.col.create_index('needs_repair', name='needs_repair', sparse=True)
+        await self.popularity_col.create_index([('requests', -1)], name='requests_desc')
+
+    async def migrate(self):
+        await self.ensure_indexes()
+        if not await self.config_col.find_one({'_id': 'storage_stats'}, {'_id': 1}):
+            files, total_bytes = await self.recount_storage()
+            logger.info(f"🛠️ Storage Counters Initialized: {files} files")
+
+    async def explain_queries(self):
+        """প্রতিটা query মেথডের query plan: [(নাম, summary), ...]"""
+        sample = await self.col.find_one({}, {'_id': 1}) or {}
+        unique_id = sample.get('_id', '')
+
+        queries = [
+            ("get_file", self.col.find({'_id': unique_id})),
+            ("get_files", self.col.find({'_id': {'$in': [unique_id]}})),
+            ("get_top_files", self.popularity_col.find().sort('requests', -1).limit(10)),
+            ("get_repair_files", self.col.find({'needs_repair': True}).limit(20)),
+            ("auth / bandwidth", self.config_col.find({'_id': 'auth_list'})),
+        ]
+        plans = []
+        for name, cursor in queries:
+            try:
+                plans.append((name, _plan_summary(await cursor.explain())))
+            except Exception as e:
+                plans.append((name, {"error": str(e)}))
+        return plans
+
+    # --- 🔐 AUTH SYSTEM ---
+    # অথরাইজড ইউজাররা মেমরিতে set হিসেবে থাকে (gatekeeper প্রতিটা মেসেজে DB তে যায় না)।
+    # এই নোডের পরিবর্তনে auth_list এর `version` বাড়ে; অন্য নোড/মেইন বটের পরিবর্তন change stream
+    # (বা না থাকলে ইউজার লিস্ট poll) দিয়ে ধরা হয়, তারা version না বাড়ালেও।
+    async def load_auth(self):
+        data = await self.config_col.find_one({'_id': 'auth_list'}) or {}
+        users = data.get('users', [])
+        self.auth_users = set(users)
+        self.auth_version = data.get('version', 0)
+        return users
+
+    async def _update_auth(self, update, upsert=False):
+        update['$inc'] = {'version': 1}
+        data = await self.config_col.find_one_and_update(
+            {'_id': 'auth_list'}, update,
+            projection={'version': 1}, upsert=upsert,
+            return_document=ReturnDocument.AFTER
         )
+        return data.get('version', 0) if data else None
+
+    async def add_auth_user(self, user_id):
+        version = await self._update_auth({'$addToSet': {'users': int(user_id)}}, upsert=True)
+        if self.auth_users is not None:
+            self.auth_users.add(int(user_id))
+            self.auth_version = version
+
+    async def remove_auth_user(self, user_id):
+        version = await self._update_auth({'$pull': {'users': int(user_id)}})
+        if self.auth_users is not None:
+            self.auth_users.discard(int(user_id))
+            if version is not None:
+                self.auth_version = version
 
     async def get_auth_users(self):
-        data = await self.config_col.find_one({'_id': 'auth_list'})
-        return data['users'] if data and 'users' in data else []
+        # লিস্ট কমান্ড রেয়ার, তাই DB থেকে (সাথে মেমরির set ও রিফ্রেশ হয়)
+        return await self.load_auth()
 
     async def is_user_allowed(self, user_id):
         if user_id == Config.OWNER_ID:
             return True
-        data = await self.config_col.find_one({'_id': 'auth_list'})
-        if data and 'users' in data:
-            return int(user_id) in data['users']
-        return False
+        if self.auth_users is None:
+            await self.load_auth()
+        return int(user_id) in self.auth_users
+
+    async def watch_auth(self, interval):
+        """
+        অন্য নোড/মেইন বট auth_list বদলালে মেমরির set রিফ্রেশ।
+        Replica set হলে change stream (সাথে সাথে), নাহলে interval পরপর ইউজার লিস্টটাই তুলনা
+        (অন্য writer `version` না বাড়াতে পারে; লিস্টটা ছোট, একটা _id lookup)।
+        """
+        try:
+            pipeline = [{'$match': {'documentKey._id': 'auth_list'}}]
+            async with self.config_col.watch(pipeline) as stream:
+                async for _ in stream:
+                    await self.load_auth()
+        except Exception as e:
+            # Standalone Mongo তে change stream নেই → polling
+            logger.info(f"Auth Change Stream Unavailable ({e}), polling every {interval}s")
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                data = await self.config_col.find_one({'_id': 'auth_list'}, {'users': 1, 'version': 1}) or {}
+                users = set(data.get('users', []))
+                if users != self.auth_users:
+                    self.auth_users = users
+                    self.auth_version = data.get('version', 0)
+            except Exception:
+                continue
+
+def _plan_summary(explain):
+    """explain() আউটপুট থেকে stage chain (index সহ) আর execution stats"""
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    plan = plan.get('queryPlan', plan)  # MongoDB 7+ (SBE)
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    stats = explain.get('executionStats', {})
+    return {
+        "plan": " ← ".join(stages),
+        "collscan": "COLLSCAN" in stages,
+        "returned": stats.get('nReturned'),
+        "keys": stats.get('totalKeysExamined'),
+        "docs": stats.get('totalDocsExamined'),
+        "ms": stats.get('executionTimeMillis'),
+    }
 
 # Initialize Database
 db = Database(Config.DATABASE_URL, Config.DATABASE_NAME)
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+from bot.info import Config
+from bot.utils.admission import admission
+from bot.utils.traffic import traffic
+from bot.utils.popularity import popularity
+from bot.utils.chunk_store import chunk_store
+from bot.utils.location_health import location_health
+
+logger = logging.getLogger(__name__)
+
+# exec এর পরেও listening socket এর fd এই env দিয়ে নতুন প্রসেসে যায়
+LISTEN_FD_ENV = "LISTEN_FD"
+
+
+class DrainController:
+    """
+    Graceful restart:
+    ১. Drain mode: নতুন স্ট্রিম 503 (Retry-After), /health 503 (readiness false)
+    ২. চলমান স্ট্রিম শেষ হওয়ার জন্য DRAIN_TIMEOUT পর্যন্ত অপেক্ষা
+    ৩. জমে থাকা হিসাব আর ক্যাশ index সেভ
+    ৪. os.execl, কিন্তু listening socket খোলা রেখে (fd handoff), তাই restart এর মাঝে
+       আসা কানেকশন refused হয় না, kernel backlog এ অপেক্ষা করে নতুন প্রসেস accept করে।
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.started_at = None
+        self._sock = None
+        self._task = None
+
+    # --- 🔌 Listening Socket ---
+    def listen_socket(self, host, port):
+        """আগের প্রসেস থেকে পাওয়া socket (restart handoff) না থাকলে নতুন bind"""
+        fd = os.environ.pop(LISTEN_FD_ENV, None)
+        if fd:
+            try:
+                sock = socket.socket(fileno=int(fd))
+                sock.setblocking(False)
+                self._sock = sock
+                logger.info(f"♻️ Listening Socket Inherited (fd {fd})")
+                return sock
+            except (OSError, ValueError) as e:
+                logger.warning(f"Socket Handoff Failed, binding again: {e}")
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if Config.REUSE_PORT and hasattr(socket, "SO_REUSEPORT"):
+            # একই পোর্টে আরেকটা instance (rolling deploy) একসাথে চলতে পারবে
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(1024)
+        sock.setblocking(False)
+        self._sock = sock
+        return sock
+
+    # --- 💾 Persist ---
+    async def persist(self):
+        """Restart/shutdown এর আগে মেমরির হিসাব আর ক্যাশ index সেভ করা"""
+        for name, job in (
+            ("traffic", traffic.flush()),
+            ("popularity", popularity.flush()),
+            ("location health", location_health.flush()),
+            ("chunk pins", asyncio.get_running_loop().run_in_executor(None, chunk_store.save)),
+        ):
+            try:
+                await job
+            except Exception as e:
+                logger.warning(f"Persist Failed ({name}): {e}")
+
+    # --- 🚰 Drain + Exec ---
+    async def restart(self, reason="Restart"):
+        """একাধিক জায়গা থেকে কল হলেও একটাই drain চলে"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._restart(reason))
+        return await asyncio.shield(self._task)
+
+    async def _restart(self, reason):
+        self.draining = True
+        self.started_at = time.monotonic()
+        logger.info(f"🚰 {reason}: Draining {admission.active} active streams (max {Config.DRAIN_TIMEOUT}s)...")
+
+        deadline = self.started_at + Config.DRAIN_TIMEOUT
+        while admission.active > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(1)
+        if admission.active:
+            logger.warning(f"⏱ Drain Timeout: {admission.active} streams will be cut")
+
+        await self.persist()
+
+        if self._sock is not None:
+            os.set_inheritable(self._sock.fileno(), True)
+            os.environ[LISTEN_FD_ENV] = str(self._sock.fileno())
+        logger.info("🔄 Restarting Process...")
+        os.execl(sys.executable, sys.executable, *sys.argv)
+
+    def stats(self):
+        return {
+            "draining": self.draining,
+            "elapsed": (time.monotonic() - self.started_at) if self.started_at else 0.0,
+            "active": admission.active,
+        }
+
+
+drain = DrainController()
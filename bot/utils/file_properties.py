@@ -1,6 +1,94 @@
 from pyrogram import Client
 from pyrogram.types import Message
+from pyrogram.file_id import FileId
+import asyncio
 from typing import Any
+from bot.info import Config
+from bot.utils.cache import AsyncLRUCache
+from bot.utils.client_scheduler import client_scheduler
+
+# ⚡ Resolved Message Cache: (client, chat_id, message_id) -> Message
+# Range/Seek রিকুয়েস্টে আবার get_messages কল করতে হবে না
+message_cache = AsyncLRUCache(
+    maxsize=Config.MSG_CACHE_SIZE,
+    ttl=Config.MSG_CACHE_TTL,
+    negative_ttl=60
+)
+
+def _message_key(client: Client, chat_id: int, message_id: int):
+    return (client.name, int(chat_id), int(message_id))
+
+async def get_media_message(client: Client, chat_id: int, message_id: int):
+    """
+    ক্লায়েন্টের দৃষ্টিতে লোকেশনের মিডিয়া মেসেজ রিটার্ন করে (cached)।
+    মেসেজ না থাকলে বা মিডিয়া না থাকলে None।
+    """
+    async def load():
+        msg = await client.get_messages(chat_id, message_id)
+        if msg and (msg.document or msg.video or msg.audio):
+            return msg
+        return None
+
+    return await message_cache.get_or_load(_message_key(client, chat_id, message_id), load)
+
+def forget_message(client: Client, chat_id: int, message_id: int):
+    """FileReferenceExpired হলে cache থেকে মেসেজ বাদ দেওয়া।"""
+    message_cache.invalidate(_message_key(client, chat_id, message_id))
+
+async def refresh_file_id(client: Client, chat_id: int, message_id: int):
+    """Cache বাদ দিয়ে মেসেজ আবার এনে নতুন file_id (file reference সহ)। না পারলে None।"""
+    forget_message(client, chat_id, message_id)
+    try:
+        msg = await get_media_message(client, chat_id, message_id)
+    except Exception:
+        return None
+    return getattr(msg, msg.media.value).file_id if msg else None
+
+async def get_stripe_peers(clients, working_client: Client, chat_id: int, message_id: int):
+    """
+    Striped mode এর জন্য বাকি ক্লায়েন্টদের নিজস্ব file_id বের করা।
+    রিটার্ন: [(client, file_id), ...] (যারা মেসেজটা অ্যাক্সেস করতে পারে শুধু তারা)
+    """
+    others = [c for c in clients if c is not working_client and c.is_connected]
+    return await _resolve_file_ids(others, chat_id, message_id)
+
+def make_handoff_resolver(clients, chat_id: int, message_id: int):
+    """
+    FloodWait handoff: স্ট্রিম চলাকালীন যেসব ক্লায়েন্ট এখনো ব্যবহার হয়নি আর FloodWait এ নেই,
+    তাদের নিজস্ব file_id বের করার async ফাংশন রিটার্ন করে।
+    """
+    async def resolve(exclude_names):
+        others = [
+            c for c in client_scheduler.candidates(clients)
+            if c.name not in exclude_names and not client_scheduler.benched_for(c)
+        ]
+        return await _resolve_file_ids(others, chat_id, message_id)
+    return resolve
+
+async def _resolve_file_ids(others, chat_id: int, message_id: int):
+    results = await asyncio.gather(
+        *(get_media_message(c, chat_id, message_id) for c in others),
+        return_exceptions=True
+    )
+    peers = []
+    for client, msg in zip(others, results):
+        if isinstance(msg, Message) and msg.media:
+            peers.append((client, getattr(msg, msg.media.value).file_id))
+    return peers
+
+def file_locations(file_data: dict):
+    """DB ডকুমেন্টের সব লোকেশন (পুরনো msg_id ফরম্যাট সহ); cache এর লিস্ট বদলায় না, কপি রিটার্ন করে"""
+    locations = list(file_data.get('locations', []))
+    if not locations and file_data.get('msg_id'):
+        locations.append({'chat_id': Config.BIN_CHANNEL_1, 'message_id': file_data.get('msg_id')})
+    return locations
+
+def get_file_dc(file_data: dict):
+    """DB ডকুমেন্টের file_id থেকে ফাইলটা কোন DC তে আছে (না পারলে None)"""
+    try:
+        return FileId.decode(file_data['file_id']).dc_id
+    except Exception:
+        return None
 
 async def get_file_id_for_stream(media: Any):
     """
@@ -0,0 +1,122 @@
+import re
+import uuid
+
+# একটি রিকুয়েস্টে সর্বোচ্চ কতগুলো range নেওয়া হবে (বেশি হলে 416)
+MAX_RANGES = 16
+_DIGITS = re.compile(r"[0-9]+")
+
+
+class RangeNotSatisfiable(Exception):
+    """Malformed বা ফাইলের বাইরে range (416)"""
+
+
+def parse_range_header(header, file_size):
+    """
+    RFC 7233 `Range` parser।
+    None → পুরো ফাইল (Range নেই, বা অজানা unit যেটা RFC অনুযায়ী ignore করতে হয়)
+    [(start, end), ...] → inclusive range, end ফাইল সাইজে clamp করা, overlap গুলো merge করা
+    Malformed বা কোনো range satisfiable না হলে RangeNotSatisfiable।
+    """
+    if not header:
+        return None
+    unit, sep, spec = header.partition("=")
+    if not sep or unit.strip().lower() != "bytes":
+        return None
+
+    specs = [part.strip() for part in spec.split(",") if part.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        raise RangeNotSatisfiable(header)
+
+    ranges = []
+    for part in specs:
+        first, dash, last = part.partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash:
+            raise RangeNotSatisfiable(header)
+
+        if not first:
+            # Suffix range: bytes=-500 → শেষের 500 বাইট (MP4 moov atom পড়ার জন্য)
+            if not _DIGITS.fullmatch(last):
+                raise RangeNotSatisfiable(header)
+            length = int(last)
+            if length and file_size:
+                ranges.append((max(0, file_size - length), file_size - 1))
+            continue
+
+        if not _DIGITS.fullmatch(first) or (last and not _DIGITS.fullmatch(last)):
+            raise RangeNotSatisfiable(header)
+        start = int(first)
+        end = int(last) if last else file_size - 1
+        if end < start:
+            raise RangeNotSatisfiable(header)
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(header)
+    return coalesce_ranges(ranges)
+
+
+def starts_at_zero(header, file_size):
+    """Range নেই বা byte 0 থেকে শুরু: প্লেয়ারের প্রথম রিকুয়েস্ট (Seek না)"""
+    try:
+        ranges = parse_range_header(header, file_size)
+    except RangeNotSatisfiable:
+        return False
+    return ranges is None or ranges[0][0] == 0
+
+
+def coalesce_ranges(ranges):
+    """Overlap বা পাশাপাশি range গুলো এক করা (ক্রমানুসারে)"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(if_range, etag, last_modified):
+    """
+    If-Range চেক: ফাইল বদলায়নি হলে True (Range মানা হবে),
+    নাহলে False (পুরো ফাইল 200 দিয়ে পাঠাতে হবে)।
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison: weak ETag কখনো match করে না
+        return if_range == etag and not etag.startswith("W/")
+    return if_range == last_modified
+
+
+class MultipartRanges:
+    """multipart/byteranges রেসপন্সের boundary আর part header তৈরি করা"""
+
+    def __init__(self, ranges, file_size, content_type):
+        self.boundary = uuid.uuid4().hex
+        self.ranges = ranges
+        self.file_size = file_size
+        self.content_type = content_type
+
+    @property
+    def mime_type(self):
+        return f"multipart/byteranges; boundary={self.boundary}"
+
+    def part_header(self, start, end):
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {self.content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode()
+
+    def closing(self):
+        return f"--{self.boundary}--\r\n".encode()
+
+    def content_length(self):
+        length = len(self.closing())
+        for start, end in self.ranges:
+            # header + data + "\r\n"
+            length += len(self.part_header(start, end)) + (end - start + 1) + 2
+        return length
@@ -0,0 +1,226 @@
+import time
+import asyncio
+import logging
+from pyrogram.errors import FloodWait, BadRequest, Forbidden, NotAcceptable
+from bot.info import Config
+from bot.utils.database import db
+from bot.utils.client_scheduler import client_scheduler
+
+logger = logging.getLogger(__name__)
+
+# একটা get_messages এ সর্বোচ্চ 200 টা id
+BATCH_SIZE = 200
+MAX_BATCH_ATTEMPTS = 3
+
+
+def bin_channels():
+    channels = [Config.BIN_CHANNEL_1, Config.BIN_CHANNEL_2, Config.BIN_CHANNEL_3, Config.BIN_CHANNEL_4]
+    return list(dict.fromkeys(c for c in channels if c))
+
+
+class ChannelScan:
+    """
+    একটা চ্যানেলের স্ক্যান অবস্থা। Bot রা চ্যানেলের history পড়তে পারে না, তাই id range
+    (200 করে batch) দিয়ে get_messages করা হয়। শেষ পাওয়া মেসেজের পরে টানা
+    `empty_batches` টা খালি batch মানে চ্যানেলের শেষ।
+    """
+
+    def __init__(self, chat_id, checkpoint, empty_batches, notify=False):
+        self.chat_id = chat_id
+        # আগে পুরো স্ক্যান হয়ে থাকলে এখন যা পাওয়া যাচ্ছে সেগুলো সত্যিই নতুন আপলোড
+        # (warm-up hook চলবে); প্রথম স্ক্যানের পুরনো ব্যাকলগে না
+        self.notify = notify
+        self.checkpoint = checkpoint    # এই id পর্যন্ত সব batch শেষ
+        self.last_seen = checkpoint     # সবচেয়ে বড় যে id তে মেসেজ পাওয়া গেছে
+        self.next_id = checkpoint + 1
+        self.window = empty_batches * BATCH_SIZE
+        self.done = set()       # শেষ হওয়া batch এর start (checkpoint এর পরের)
+        self.retry = []         # FloodWait/এরর এ ফেরত আসা batch
+        self.attempts = {}
+        self.blocked = set()    # যেসব ক্লায়েন্ট চ্যানেলটা অ্যাক্সেস করতে পারে না
+        self.inflight = 0
+        self.files = 0
+        self.new = 0
+        self.error = None
+
+    def next_batch(self):
+        if self.retry:
+            return self.retry.pop()
+        if self.next_id > self.last_seen + self.window:
+            return None
+        start = self.next_id
+        self.next_id += BATCH_SIZE
+        return start
+
+    @property
+    def finished(self):
+        return self.error is not None or (
+            not self.retry and not self.inflight and self.next_id > self.last_seen + self.window
+        )
+
+    def complete(self, start, found_max):
+        self.attempts.pop(start, None)
+        self.last_seen = max(self.last_seen, found_max)
+        self.done.add(start)
+        while self.checkpoint + 1 in self.done:
+            self.done.remove(self.checkpoint + 1)
+            self.checkpoint += BATCH_SIZE
+
+    def fail(self, start):
+        """আবার চেষ্টার জন্য ফেরত; বারবার ফেল করলে batch বাদ (True)"""
+        attempts = self.attempts.get(start, 0) + 1
+        if attempts >= MAX_BATCH_ATTEMPTS:
+            logger.warning(f"Index Batch Skipped ({self.chat_id}: {start}-{start + BATCH_SIZE - 1})")
+            self.complete(start, 0)
+            return True
+        self.attempts[start] = attempts
+        self.retry.append(start)
+        return False
+
+    @property
+    def resume_from(self):
+        # শেষের খালি অংশ সেভ হয় না, পরে সেখানে নতুন মেসেজ আসবে
+        return min(self.checkpoint, self.last_seen)
+
+
+class ChannelIndexer:
+    """
+    Bin চ্যানেলগুলোর পুরো history স্ক্যান করে ফাইল ক্যাটালগ (সব লোকেশন সহ) তৈরি।
+    প্রতিটা ক্লাস্টার ক্লায়েন্ট একটা worker, সবাই মিলে batch ভাগ করে নেয়।
+    Checkpoint DB তে থাকে (থামালে/রিস্টার্টে সেখান থেকে চলে), FloodWait খাওয়া ক্লায়েন্ট
+    ওয়েট শেষ না হওয়া পর্যন্ত বসে থাকে আর batch টা অন্য ক্লায়েন্ট নেয়।
+    লেখা হয় add_files_bulk দিয়ে (batch প্রতি একটা bulk_write)।
+    """
+
+    def __init__(self):
+        self.clients = []
+        self.scans = []
+        self.started_at = None
+        self._task = None
+        self.stopping = False
+
+    def attach(self, clients):
+        self.clients = clients
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self, channels=None, indexed_only=False):
+        """indexed_only: শুধু আগে পুরো স্ক্যান হওয়া চ্যানেলে নতুন মেসেজ (পিরিয়ডিক রান)"""
+        if self.running:
+            return self._task
+        self.stopping = False
+        self._task = asyncio.ensure_future(self.run(channels or bin_channels(), indexed_only))
+        return self._task
+
+    async def run_incremental(self):
+        """Scheduler থেকে: আগের রান চললে কিছু না"""
+        if not self.running:
+            await self.start(indexed_only=True)
+
+    def stop(self):
+        self.stopping = True
+
+    async def run(self, channels, indexed_only=False):
+        checkpoints, complete = await db.get_index_checkpoints()
+        if indexed_only:
+            channels = [chat_id for chat_id in channels if chat_id in complete]
+            if not channels:
+                return
+        self.scans = [
+            ChannelScan(chat_id, checkpoints.get(chat_id, 0), Config.INDEX_EMPTY_BATCHES, chat_id in complete)
+            for chat_id in channels
+        ]
+        self.started_at = time.monotonic()
+        clients = [c for c in self.clients if c.is_connected]
+        logger.info(f"📇 Indexing {len(self.scans)} channels with {len(clients)} clients...")
+
+        await asyncio.gather(*(self._worker(c, len(clients)) for c in clients))
+        for scan in self.scans:
+            if not scan.error and len(scan.blocked) >= len(clients):
+                scan.error = "No client can access this channel"
+            if scan.finished and not scan.error and not self.stopping and not scan.notify:
+                await db.mark_index_complete(scan.chat_id)
+        logger.info(f"📇 Indexing {'Stopped' if self.stopping else 'Finished'}: {self.stats()['channels']}")
+
+    def _pick(self, client, total_clients):
+        # সবচেয়ে কম চলমান batch এর চ্যানেল আগে (চ্যানেলগুলোর মধ্যে ভাগাভাগি)
+        for scan in sorted(self.scans, key=lambda s: s.inflight):
+            if scan.error or client.name in scan.blocked:
+                continue
+            if len(scan.blocked) >= total_clients:
+                scan.error = "No client can access this channel"
+                continue
+            start = scan.next_batch()
+            if start is not None:
+                return scan, start
+        return None, None
+
+    async def _worker(self, client, total_clients):
+        while not self.stopping:
+            wait = client_scheduler.benched_for(client)
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            scan, start = self._pick(client, total_clients)
+            if scan is None:
+                if all(s.finished or client.name in s.blocked for s in self.scans):
+                    return
+                await asyncio.sleep(1)  # অন্য worker এর batch এ নতুন মেসেজ পেলে window বাড়বে
+                continue
+
+            scan.inflight += 1
+            try:
+                messages = await client.get_messages(scan.chat_id, list(range(start, start + BATCH_SIZE)))
+            except FloodWait as e:
+                client_scheduler.record_flood(client, e.value)
+                scan.retry.append(start)
+                continue
+            except (BadRequest, Forbidden, NotAcceptable) as e:
+                # চ্যানেলে অ্যাডমিন না / চ্যানেল নেই: এই ক্লায়েন্ট দিয়ে আর না
+                logger.warning(f"Index: {client.name} can't read {scan.chat_id}: {e}")
+                scan.blocked.add(client.name)
+                scan.retry.append(start)
+                continue
+            except Exception as e:
+                logger.warning(f"Index Batch Error ({client.name}, {scan.chat_id}:{start}): {e}")
+                scan.fail(start)
+                await asyncio.sleep(1)
+                continue
+            finally:
+                scan.inflight -= 1
+
+            found = [m for m in messages if m and not m.empty]
+            media = [m for m in found if m.document or m.video or m.audio]
+            try:
+                if media:
+                    total, new = await db.add_files_bulk(media, notify=scan.notify)
+                    scan.files += total
+                    scan.new += new
+                scan.complete(start, max((m.id for m in found), default=0))
+                await db.save_index_checkpoint(scan.chat_id, scan.resume_from)
+            except Exception as e:
+                logger.warning(f"Index Write Error ({scan.chat_id}:{start}): {e}")
+                scan.fail(start)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "elapsed": (time.monotonic() - self.started_at) if self.started_at else 0.0,
+            "channels": [
+                {
+                    "chat_id": s.chat_id,
+                    "checkpoint": s.resume_from,
+                    "files": s.files,
+                    "new": s.new,
+                    "finished": s.finished,
+                    "error": s.error,
+                }
+                for s in self.scans
+            ],
+        }
+
+
+indexer = ChannelIndexer()
@@ -0,0 +1,227 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from pyrogram.errors import FloodWait, BadRequest, Forbidden, NotAcceptable
+from bot.info import Config
+from bot.utils.database import db
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.file_properties import get_media_message
+
+logger = logging.getLogger(__name__)
+
+# ফেইলের ধরন
+DELETED = "deleted"   # মেসেজ নেই / মিডিয়া নেই: সব ক্লায়েন্টের জন্য মৃত
+DENIED = "denied"     # এই ক্লায়েন্ট চ্যানেলটা অ্যাক্সেস করতে পারে না
+ERROR = "error"       # নেটওয়ার্ক/অন্যান্য সাময়িক এরর
+
+# (location, client) জোড়ার স্কোর: কম = আগে চেষ্টা
+SCORE_PROVEN = 0      # আগে কোনো ক্লায়েন্ট এখান থেকে ফাইল পেয়েছে
+SCORE_UNKNOWN = 1
+SCORE_RECENT_ERROR = 10
+SCORE_DENIED = 100
+SCORE_DEAD = 1000
+
+
+def location_key(chat_id, message_id):
+    return f"{chat_id}:{message_id}"
+
+
+class LocationRecord:
+    """
+    একটা কপির (chat_id, message_id) হেলথ: শেষ সফল/ব্যর্থ সময়, ফেইলের ধরন, কোন ক্লায়েন্ট পারে/পারে না।
+    `deleted_at` আলাদা রাখা হয়: পরে অন্য ক্লায়েন্টের DENIED/ERROR এ মুছে যাওয়া কপি আবার জীবিত হয় না,
+    শুধু success() এ মোছে।
+    """
+
+    __slots__ = ("last_ok", "last_fail", "fail_type", "deleted_at", "ok_clients", "denied_clients")
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.last_ok = data.get("last_ok", 0.0)
+        self.last_fail = data.get("last_fail", 0.0)
+        self.fail_type = data.get("fail_type")
+        self.deleted_at = data.get("deleted_at")
+        self.ok_clients = dict(data.get("ok_clients", {}))          # name -> সময়
+        self.denied_clients = dict(data.get("denied_clients", {}))  # name -> সময়
+
+    @property
+    def dead(self):
+        # সফল হওয়ার পরে মুছে গেলেও deleted_at > last_ok হবে
+        return self.deleted_at is not None and self.deleted_at > self.last_ok
+
+    def denied(self, client_name, now):
+        since = self.denied_clients.get(client_name)
+        return since is not None and now - since < Config.LOCATION_DENY_TTL
+
+    def score(self, client_name, now):
+        if self.dead:
+            return SCORE_DEAD
+        if self.denied(client_name, now):
+            return SCORE_DENIED
+        if self.fail_type == ERROR and self.last_fail > self.last_ok and now - self.last_fail < Config.LOCATION_RETRY_AFTER:
+            return SCORE_RECENT_ERROR
+        return SCORE_PROVEN if self.last_ok else SCORE_UNKNOWN
+
+    def to_doc(self):
+        return {
+            "last_ok": self.last_ok,
+            "last_fail": self.last_fail,
+            "fail_type": self.fail_type,
+            "deleted_at": self.deleted_at,
+            "ok_clients": self.ok_clients,
+            "denied_clients": self.denied_clients,
+        }
+
+
+class LocationHealth:
+    """
+    ফাইলের প্রতিটা কপির হেলথ রেকর্ড মেমরিতে (LRU, `capacity` টা ফাইল)।
+    রিকুয়েস্টে (client, location) জোড়াগুলো স্কোর অনুযায়ী চেষ্টা হয়, তাই মুছে যাওয়া বা
+    অ্যাক্সেস নেই এমন কপির জন্য প্রতিবার ফেইল হওয়া get_messages কল হয় না।
+    বদলানো রেকর্ড `interval` পরপর ফাইল ডকুমেন্টের `location_health` এ যায়;
+    মৃত কপি থাকলে ডকুমেন্টে `needs_repair` সেট হয় (/repair এ লিস্ট)।
+    """
+
+    def __init__(self, capacity, interval):
+        self.capacity = capacity
+        self.interval = interval
+        self._files = OrderedDict()  # unique_id -> {location key: LocationRecord}
+        self._dirty = set()
+
+    # --- 📋 Records ---
+    def records(self, unique_id, file_data=None):
+        """মেমরিতে না থাকলে ডকুমেন্টে সেভ করা হেলথ থেকে লোড"""
+        records = self._files.get(unique_id)
+        if records is not None:
+            self._files.move_to_end(unique_id)
+            return records
+        saved = (file_data or {}).get("location_health") or {}
+        records = self._files[unique_id] = {key: LocationRecord(data) for key, data in saved.items()}
+        self._evict()
+        return records
+
+    def _evict(self):
+        # flush না হওয়া রেকর্ড বাদ যায় না
+        for unique_id in list(self._files):
+            if len(self._files) <= self.capacity:
+                break
+            if unique_id not in self._dirty:
+                del self._files[unique_id]
+
+    def _record(self, unique_id, loc):
+        records = self.records(unique_id)
+        key = location_key(loc.get("chat_id"), loc.get("message_id"))
+        record = records.get(key)
+        if record is None:
+            record = records[key] = LocationRecord()
+        return record
+
+    def success(self, unique_id, loc, client):
+        record = self._record(unique_id, loc)
+        # প্রতিটা সফল রিকুয়েস্টে DB write না: অবস্থা বদলালে তবেই dirty
+        if record.fail_type is not None or record.deleted_at is not None or client.name not in record.ok_clients:
+            self._dirty.add(unique_id)
+        now = time.time()
+        record.last_ok = now
+        record.fail_type = None
+        record.deleted_at = None
+        record.ok_clients[client.name] = now
+        record.denied_clients.pop(client.name, None)
+
+    def failure(self, unique_id, loc, client, fail_type):
+        record = self._record(unique_id, loc)
+        self._dirty.add(unique_id)
+        was_dead = record.dead
+        now = time.time()
+        record.last_fail = now
+        record.fail_type = fail_type
+        if fail_type == DELETED:
+            record.deleted_at = now
+        elif fail_type == DENIED:
+            record.denied_clients[client.name] = now
+            record.ok_clients.pop(client.name, None)
+        if record.dead and not was_dead:
+            logger.warning(f"🩹 Dead Replica: {unique_id} @ {loc.get('chat_id')}/{loc.get('message_id')}")
+
+    # --- 🎯 Ranking ---
+    def ranked_pairs(self, unique_id, file_data, clients, locations):
+        """
+        [(client, location), ...] স্কোর অনুযায়ী; সমান স্কোরে ক্লায়েন্টের লোড অর্ডার
+        (scheduler) আর তারপর ডকুমেন্টের লোকেশন অর্ডার ঠিক থাকে।
+        """
+        records = self.records(unique_id, file_data)
+        now = time.time()
+        pairs = []
+        for loc_index, loc in enumerate(locations):
+            record = records.get(location_key(loc.get("chat_id"), loc.get("message_id")))
+            for client_index, client in enumerate(clients):
+                score = record.score(client.name, now) if record else SCORE_UNKNOWN
+                pairs.append((score, client_index, loc_index, client, loc))
+        pairs.sort(key=lambda p: p[:3])
+        return [(client, loc) for _, _, _, client, loc in pairs]
+
+    async def locate(self, unique_id, file_data, clients, locations):
+        """
+        প্রথম যে (client, location) থেকে মিডিয়া মেসেজ পাওয়া যায়: (client, msg)।
+        কেউ না পারলে (None, None)। FloodWait খাওয়া ক্লায়েন্টের বাকি জোড়া বাদ।
+        """
+        benched = set()
+        for client, loc in self.ranked_pairs(unique_id, file_data, clients, locations):
+            chat_id, msg_id = loc.get("chat_id"), loc.get("message_id")
+            if not chat_id or not msg_id or client.name in benched:
+                continue
+            try:
+                # ⚡ Cached: একই ভিডিওর Seek/Range এ আর MTProto কল হবে না
+                msg = await get_media_message(client, chat_id, msg_id)
+            except FloodWait as e:
+                client_scheduler.record_flood(client, e.value)
+                benched.add(client.name)
+                continue
+            except (BadRequest, Forbidden, NotAcceptable):
+                self.failure(unique_id, loc, client, DENIED)
+                continue
+            except Exception:
+                self.failure(unique_id, loc, client, ERROR)
+                continue
+            if msg:
+                self.success(unique_id, loc, client)
+                return client, msg
+            self.failure(unique_id, loc, client, DELETED)
+        return None, None
+
+    # --- 💾 Persist ---
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        updates, needs_repair = {}, set()
+        for unique_id in dirty:
+            records = self._files.get(unique_id)
+            if records is None:
+                continue
+            updates[unique_id] = {key: record.to_doc() for key, record in records.items()}
+            if any(record.dead for record in records.values()):
+                needs_repair.add(unique_id)
+        try:
+            await db.save_location_health(updates, needs_repair)
+        except Exception as e:
+            logger.warning(f"Location Health Flush Error: {e}")
+            self._dirty |= dirty  # পরের flush এ আবার
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def stats(self):
+        records = [r for recs in self._files.values() for r in recs.values()]
+        return {
+            "files": len(self._files),
+            "locations": len(records),
+            "dead": sum(1 for r in records if r.dead),
+            "dirty": len(self._dirty),
+        }
+
+
+location_health = LocationHealth(Config.LOCATION_HEALTH_SIZE, Config.LOCATION_HEALTH_FLUSH_INTERVAL)
@@ -0,0 +1,167 @@
+import random
+import asyncio
+import logging
+from pyrogram import raw
+from pyrogram.session import Session, Auth
+from pyrogram.errors import AuthBytesInvalid
+from bot.info import Config
+
+logger = logging.getLogger(__name__)
+
+PING_TIMEOUT = 10
+MAX_BACKOFF = 60
+
+
+class MediaSessionPool:
+    """
+    (client, dc_id) প্রতি একটি authorized media session এর warm pool।
+    স্টার্টআপে তৈরি হয়, সব ByteStreamer শেয়ার করে; health check ফেল করলে
+    backoff সহ আবার কানেক্ট করে। তাই cold স্ট্রিমের প্রথম বাইটে DC handshake লাগে না।
+    """
+
+    def __init__(self):
+        self._sessions = {}   # (client.name, dc_id) -> Session
+        self._clients = {}    # client.name -> client
+        self._locks = {}
+        self._failures = {}   # (client.name, dc_id) -> consecutive failures
+        self._health_task = None
+
+    def _lock(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    async def _create(client, dc_id):
+        test_mode = await client.storage.test_mode()
+        if dc_id != await client.storage.dc_id():
+            session = Session(
+                client, dc_id,
+                await Auth(client, dc_id, test_mode).create(),
+                test_mode, is_media=True
+            )
+            await session.start()
+
+            for _ in range(6):
+                exported_auth = await client.invoke(
+                    raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+                )
+                try:
+                    await session.invoke(
+                        raw.functions.auth.ImportAuthorization(
+                            id=exported_auth.id,
+                            bytes=exported_auth.bytes
+                        )
+                    )
+                    break
+                except AuthBytesInvalid:
+                    continue
+            else:
+                await session.stop()
+                raise AuthBytesInvalid
+        else:
+            session = Session(
+                client, dc_id,
+                await client.storage.auth_key(),
+                test_mode, is_media=True
+            )
+            await session.start()
+        return session
+
+    async def get(self, client, dc_id):
+        """Warm session রিটার্ন করে, না থাকলে তৈরি করে"""
+        key = (client.name, dc_id)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        async with self._lock(key):
+            session = self._sessions.get(key)
+            if session is None:
+                # আগে থেকেই রেজিস্টার, যাতে তৈরি ফেল করলেও health loop আবার চেষ্টা করতে পারে
+                self._clients[client.name] = client
+                session = await self._create(client, dc_id)
+                self._sessions[key] = session
+                self._failures.pop(key, None)
+                logger.info(f"🔌 Media Session Ready: {client.name} → DC{dc_id}")
+            return session
+
+    async def warm_up(self, clients, dc_ids):
+        async def _warm(client, dc_id):
+            try:
+                await self.get(client, dc_id)
+            except Exception as e:
+                # ফেইল হিসাবে রাখা: health loop backoff সহ আবার চেষ্টা করবে,
+                # নাহলে প্রথম ভিউয়ারকেই export/auth (আর FloodWait) এর খরচ দিতে হত
+                key = (client.name, dc_id)
+                self._failures[key] = self._failures.get(key, 0) + 1
+                logger.warning(f"Media Session Warm-up Failed ({client.name} → DC{dc_id}): {e}")
+
+        await asyncio.gather(*(
+            _warm(c, dc) for c in clients if c.is_connected for dc in dc_ids
+        ))
+
+    async def _drop(self, key):
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+
+    async def _reconnect(self, key):
+        client = self._clients.get(key[0])
+        failures = self._failures.get(key, 0)
+        # Exponential backoff: 1s, 2s, 4s ... সর্বোচ্চ MAX_BACKOFF
+        await asyncio.sleep(min(MAX_BACKOFF, 2 ** failures))
+        await self._drop(key)
+        try:
+            await self.get(client, key[1])
+        except Exception as e:
+            self._failures[key] = failures + 1
+            logger.warning(f"Media Session Reconnect Failed ({key[0]} → DC{key[1]}): {e}")
+
+    async def _check(self, key):
+        session = self._sessions.get(key)
+        if session is None:
+            if key in self._failures:
+                await self._reconnect(key)
+            return
+        try:
+            await asyncio.wait_for(
+                session.invoke(raw.functions.Ping(ping_id=random.getrandbits(63))),
+                PING_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"Media Session Unhealthy ({key[0]} → DC{key[1]}): {e}")
+            self._failures.setdefault(key, 0)
+            await self._reconnect(key)
+
+    async def health_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            keys = set(self._sessions) | set(self._failures)
+            await asyncio.gather(*(self._check(key) for key in keys), return_exceptions=True)
+
+    def start_health_checks(self, interval=None):
+        if self._health_task is None:
+            self._health_task = asyncio.ensure_future(
+                self.health_loop(interval or Config.MEDIA_SESSION_CHECK)
+            )
+
+    async def stop_all(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for key in list(self._sessions):
+            await self._drop(key)
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "failing": len([k for k, v in self._failures.items() if v]),
+        }
+
+
+media_sessions = MediaSessionPool()
@@ -0,0 +1,227 @@
+import time
+from bisect import bisect_left
+from aiohttp import web
+from bot.info import Config
+
+# Prometheus text format (version 0.0.4), কোনো বাইরের লাইব্রেরি ছাড়া।
+# Hot path এ শুধু dict এ যোগ/বাড়ানো হয়; বাকি সংখ্যাগুলো scrape এর সময় stats() থেকে পড়া হয়।
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        """callback থাকলে scrape এর সময় সেটা থেকে [(label values, value), ...] নেওয়া হয়"""
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}  # label values tuple -> value
+
+    def samples(self):
+        items = self.callback() if self.callback else self._values.items()
+        for labels, value in items:
+            yield f"{self.name}{_labels_text(self.labelnames, labels)} {_number(value)}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            # [প্রতি bucket এর count..., sum, count]
+            entry = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def samples(self):
+        for labels, entry in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = _labels_text(self.labelnames, labels, (("le", _number(bound)),))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            base = _labels_text(self.labelnames, labels)
+            yield f"{self.name}_sum{base} {_number(entry[-2])}"
+            yield f"{self.name}_count{base} {entry[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+registry = Registry()
+
+# --- 🌐 HTTP ---
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")
+))
+# স্ট্রিমে হেডার প্রথম Telegram চাঙ্কের আগেই যায়, তাই TTFB মাপা হয় প্রথম বডি write এ
+http_ttfb = registry.register(Histogram(
+    "http_ttfb_seconds", "Time until the first body byte was written", ("route",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+))
+http_headers = registry.register(Histogram(
+    "http_response_headers_seconds", "Time until response headers were sent", ("route",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+))
+
+# --- 📦 MTProto ---
+chunk_fetch = registry.register(Histogram(
+    "tg_chunk_fetch_seconds", "upload.GetFile latency per chunk", ("client",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32)
+))
+# ভিউয়ারকে পাঠানো বাইট (write_stream এ গোনা); ক্যাশ/ring/শেয়ার করা fetch এর জন্য fetched বাইটের চেয়ে বেশি হতে পারে
+client_served = registry.register(Counter(
+    "tg_client_served_bytes_total", "Bytes written to viewers per working client session", ("client",)
+))
+
+
+# --- 📊 Scrape এর সময় পড়া সংখ্যা (import cycle এড়াতে lazy import) ---
+def _clients(field):
+    def collect():
+        from bot.utils.client_scheduler import client_scheduler
+        return [((c["name"],), c[field]) for c in client_scheduler.stats()]
+    return collect
+
+
+def _caches():
+    from bot.utils.database import db
+    from bot.utils.file_properties import message_cache
+    from bot.utils.chunk_store import chunk_store
+    return {
+        "file": db.file_cache.stats(),
+        "message": message_cache.stats(),
+        "chunk_disk": chunk_store.stats(),
+    }
+
+
+def _cache_field(field):
+    return lambda: [((name,), st[field]) for name, st in _caches().items()]
+
+
+def _admission(field):
+    def collect():
+        from bot.utils.admission import admission
+        return [((), admission.stats()[field])]
+    return collect
+
+
+def _shared_fetches():
+    from bot.utils.custom_dl import chunk_flights
+    st = chunk_flights.stats()
+    return [(("shared",), st["shared"]), (("ring",), st["ring_hits"])]
+
+
+registry.register(Counter("tg_client_fetched_bytes_total", "Bytes fetched from Telegram per client session", ("client",), _clients("total_bytes")))
+registry.register(Counter("tg_floodwait_total", "FloodWait errors per client session", ("client",), _clients("flood_count")))
+registry.register(Gauge("tg_client_active_streams", "Streams currently served per client session", ("client",), _clients("active_streams")))
+registry.register(Gauge("stream_active", "Admitted streams in progress", (), _admission("active")))
+registry.register(Gauge("stream_queued", "Streams waiting in the admission queue", (), _admission("waiting")))
+registry.register(Counter("stream_rejected_total", "Streams refused with 503 (queue full)", (), _admission("rejected")))
+registry.register(Counter("stream_queue_timeout_total", "Streams refused with 503 (queue timeout)", (), _admission("timed_out")))
+registry.register(Counter("cache_hits_total", "Cache hits", ("cache",), _cache_field("hits")))
+registry.register(Counter("cache_misses_total", "Cache misses", ("cache",), _cache_field("misses")))
+registry.register(Gauge("cache_hit_ratio", "Cache hit ratio since start", ("cache",), _cache_field("hit_ratio")))
+registry.register(Counter("chunk_shared_fetches_total", "Chunk fetches served from another stream", ("source",), _shared_fetches))
+
+
+# --- 🧩 aiohttp wiring ---
+def _route_name(request):
+    resource = request.match_info.route.resource
+    return resource.canonical if resource is not None else "unmatched"
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    request["metrics_start"] = time.monotonic()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        http_requests.inc(_route_name(request), request.method, str(status))
+
+
+def first_byte(request):
+    """প্রথম বডি বাইট লেখার মুহূর্ত = Time To First Byte (রিকুয়েস্ট প্রতি একবার)"""
+    start = request.get("metrics_start")
+    if start is None or request.get("metrics_ttfb"):
+        return
+    request["metrics_ttfb"] = True
+    http_ttfb.observe(time.monotonic() - start, _route_name(request))
+
+
+async def on_response_prepare(request, response):
+    """হেডার পাঠানোর মুহূর্ত; সাধারণ web.Response এ বডি সাথে সাথেই যায়, তাই সেটাই TTFB"""
+    start = request.get("metrics_start")
+    if start is not None:
+        http_headers.observe(time.monotonic() - start, _route_name(request))
+        if isinstance(response, web.Response):
+            first_byte(request)
+
+
+async def metrics_handler(request):
+    # METRICS_TOKEN দেওয়া থাকলে ?token= বা Authorization: Bearer লাগবে
+    if Config.METRICS_TOKEN:
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else request.query.get("token")
+        if token != Config.METRICS_TOKEN:
+            return web.Response(status=401, text="Unauthorized")
+    return web.Response(body=registry.render().encode(), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from bot.info import Config
+from bot.utils.database import db
+from bot.utils.chunk_store import chunk_store
+from bot.utils.warmup import warm_files
+
+logger = logging.getLogger(__name__)
+
+
+class SpaceSaving:
+    """
+    Space-Saving sketch: সর্বোচ্চ `capacity` টা ফাইলের (requests, bytes) মেমরিতে রাখে।
+    ভর্তি থাকলে নতুন ফাইল সবচেয়ে কম request এর ফাইলকে সরিয়ে তার count + 1 নিয়ে ঢোকে
+    (error = সরানো count), তাই সত্যিকারের hot ফাইলগুলো কখনো হারায় না।
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = {}  # key -> [requests, bytes, error]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0] += 1
+            return
+        if len(self._entries) < self.capacity:
+            self._entries[key] = [1, 0, 0]
+            return
+        victim = min(self._entries, key=lambda k: self._entries[k][0])
+        floor = self._entries.pop(victim)[0]
+        self._entries[key] = [floor + 1, 0, floor]
+
+    def add_bytes(self, key, size):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] += size
+
+    def top(self, n):
+        """[(key, requests, bytes), ...] বেশি request আগে"""
+        ranked = sorted(self._entries.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, e[0], e[1]) for key, e in ranked[:n]]
+
+    def drain(self):
+        """সব entry নিয়ে sketch খালি করা: {key: (নিশ্চিত requests, bytes)}"""
+        entries, self._entries = self._entries, {}
+        return {key: (e[0] - e[2], e[1]) for key, e in entries.items()}
+
+
+class PopularityTracker:
+    """
+    ফাইল অনুযায়ী request আর পাঠানো বাইট (Space-Saving sketch এ)।
+    `interval` পরপর Mongo এর popularity কালেকশনে flush হয়, আর সেই সময়ের সবচেয়ে
+    hot ফাইলগুলোর শুরু আর moov চাঙ্ক ডিস্ক ক্যাশে pre-warm হয়।
+    """
+
+    def __init__(self, capacity, interval):
+        self.sketch = SpaceSaving(capacity)
+        self.interval = interval
+
+    def hit(self, unique_id):
+        self.sketch.hit(unique_id)
+
+    def add_bytes(self, unique_id, size):
+        self.sketch.add_bytes(unique_id, size)
+
+    def live_top(self, n):
+        return self.sketch.top(n)
+
+    async def flush(self):
+        counts = {k: v for k, v in self.sketch.drain().items() if v[0] > 0 or v[1] > 0}
+        if not counts:
+            return
+        try:
+            await db.add_popularity(counts)
+        except Exception as e:
+            # আনুমানিক হিসাব, হারালে বড় ক্ষতি নেই
+            logger.warning(f"Popularity Flush Error: {e}")
+
+    async def run(self, clients):
+        while True:
+            await asyncio.sleep(self.interval)
+            hot = [key for key, _, _ in self.sketch.top(Config.PREWARM_TOP)]
+            # পরের interval পর্যন্ত শুধু এই ফাইলগুলোর চাঙ্ক ডিস্ক ক্যাশে ঢুকবে
+            chunk_store.set_hot(hot)
+            await self.flush()
+            if hot:
+                await warm_files(clients, hot)
+
+
+popularity = PopularityTracker(Config.POPULARITY_SIZE, Config.POPULARITY_FLUSH_INTERVAL)
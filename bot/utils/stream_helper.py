@@ -1,59 +1,135 @@
-import math
+import asyncio
 import logging
 from aiohttp import web
 from urllib.parse import quote 
+from email.utils import formatdate
 from pyrogram.types import Message
-from pyrogram.errors import FileReferenceExpired
 
+from bot.info import Config
 # 👇 আপনার রিকুয়েস্ট অনুযায়ী custom_dl ইমপোর্ট করা হলো
 from bot.utils.custom_dl import ByteStreamer 
+from bot.utils.file_properties import refresh_file_id
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.traffic import traffic
+from bot.utils.popularity import popularity
+from bot.utils.metrics import client_served, first_byte
+from bot.utils.chunk_plan import TG_CHUNK, plan_range
+from bot.utils.http_range import parse_range_header, if_range_matches, RangeNotSatisfiable, MultipartRanges
 
 # Logging Setup
 logger = logging.getLogger(__name__)
-TG_CHUNK = 1024 * 1024  # 1MB Telegram Chunk Size
 
 # --- CORS Headers ---
 def cors_headers():
     return {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-        "Access-Control-Allow-Headers": "Range, Content-Type, User-Agent",
-        "Access-Control-Expose-Headers": "Content-Length, Content-Range",
+        "Access-Control-Allow-Headers": "Range, If-Range, Content-Type, User-Agent",
+        "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges, ETag",
     }
 
-# --- 🔄 RETRY GENERATOR (The Magic Fix) ---
-async def yield_with_retry(client, message, file_id, chunk_index, first_part_cut, last_part_cut, part_count):
+# --- 🔄 RESUMABLE STREAM (The Magic Fix) ---
+class ShortRead(Exception):
+    """Telegram range শেষ হওয়ার আগেই চাঙ্ক দেওয়া বন্ধ করেছে"""
+
+
+async def _recover(client, message, peers, resolver, failures):
     """
-    এই ফাংশনটি custom_dl কে কল করবে। 
-    যদি FileReferenceExpired হয়, তাহলে মেসেজ রিফ্রেশ করে আবার custom_dl কল করবে।
+    এরর এর পর কোন ক্লায়েন্ট/file_id দিয়ে আবার শুরু হবে:
+    প্রথমবার একই ক্লায়েন্টে file reference রিফ্রেশ, বারবার ফেল করলে (বা ক্লায়েন্ট
+    FloodWait এ থাকলে) resolver দিয়ে অন্য ক্লায়েন্টে switch।
     """
-    try:
-        # ১. সাধারণ চেষ্টা (Attempt 1)
-        streamer = ByteStreamer(client)
-        async for chunk in streamer.yield_file(file_id, chunk_index, first_part_cut, last_part_cut, part_count):
-            yield chunk
+    chat_id, message_id = message.chat.id, message.id
+    new_file_id = None
+    if not client_scheduler.benched_for(client):
+        new_file_id = await refresh_file_id(client, chat_id, message_id)
+
+    if (new_file_id is None or failures > 1) and resolver:
+        try:
+            alternates = await resolver({client.name})
+        except Exception as e:
+            logger.warning(f"Resume Resolve Failed: {e}")
+            alternates = []
+        if alternates:
+            other, other_file_id = alternates[0]
+            logger.info(f"🔀 Resuming on {other.name}")
+            return other, other_file_id, ()
+
+    if new_file_id is None:
+        raise ValueError("Message no longer available")
+
+    # Striped peers দেরও reference পুরনো হতে পারে
+    if peers:
+        fresh = await asyncio.gather(*(refresh_file_id(c, chat_id, message_id) for c, _ in peers))
+        peers = [(c, fid) for (c, _), fid in zip(peers, fresh) if fid]
+    return client, new_file_id, peers
 
-    except FileReferenceExpired:
-        # ⚠️ এরর ধরা পড়লে
-        logger.warning(f"⚠️ FileRef Expired for {file_id}. Refreshing & Retrying...")
-        
+
+async def yield_with_retry(client, message, file_id, start, end, peers=(), resolver=None):
+    """
+    Resumable state machine: কত বাইট পাঠানো হয়েছে (position) ট্র্যাক করে।
+    যেকোনো এরর হলে (FileReferenceExpired, নেটওয়ার্ক রিসেট, short read ...) reference রিফ্রেশ
+    বা ক্লায়েন্ট বদলে ঠিক পরের বাইট থেকে নতুন প্ল্যান করে চালিয়ে যায়, তাই ভিউয়ার কোনো
+    বাইট দুইবার পায় না। একটানা ব্যর্থতা Config.STREAM_MAX_RETRIES পার হলে এরর raise।
+    """
+    position = start
+    failures = 0
+
+    while position <= end:
+        plan = plan_range(position, end, TG_CHUNK)
+        streamer = ByteStreamer(client)
         try:
-            # ২. মেসেজ রিফ্রেশ করে নতুন File ID আনা
-            refresh_msg = await client.get_messages(chat_id=message.chat.id, message_ids=message.id)
-            new_media = getattr(refresh_msg, refresh_msg.media.value)
-            new_file_id = new_media.file_id # নতুন ফ্রেশ আইডি
-            
-            # ৩. আবার চেষ্টা (Attempt 2 with New ID)
-            streamer = ByteStreamer(client)
-            async for chunk in streamer.yield_file(new_file_id, chunk_index, first_part_cut, last_part_cut, part_count):
+            async for chunk in streamer.yield_file(file_id, *plan, peers=peers, resolver=resolver):
+                position += len(chunk)
+                failures = 0  # অগ্রগতি হয়েছে → counter রিসেট
                 yield chunk
-                
+            if position <= end:
+                raise ShortRead(f"stopped at byte {position} of {end}")
+
         except Exception as e:
-            logger.error(f"❌ Retry Failed: {e}")
-            raise e
+            failures += 1
+            if failures > Config.STREAM_MAX_RETRIES:
+                logger.error(f"❌ Resume Failed at byte {position}: {e}")
+                raise
+
+            delay = min(8, 0.5 * 2 ** (failures - 1))  # 0.5s, 1s, 2s ... সর্বোচ্চ 8s
+            logger.warning(
+                f"⚠️ Stream interrupted at byte {position} ({type(e).__name__}: {e}). "
+                f"Resuming in {delay}s ({failures}/{Config.STREAM_MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+            try:
+                client, file_id, peers = await _recover(client, message, peers, resolver, failures)
+            except Exception as refresh_error:
+                logger.error(f"❌ Refresh Failed: {refresh_error}")
+                raise e
+
+# --- 🧮 Range Body ---
+def range_body(message, file_id, start, end, peers=(), resolver=None):
+    """একটি (start, end) range এর জন্য চাঙ্ক জেনারেটর"""
+    # আমরা সরাসরি custom_dl কল না করে আমাদের 'yield_with_retry' কল করব
+    # (OffsetInvalid Fix: চাঙ্ক প্ল্যান প্রতিটি resume এ position থেকে নতুন করে হয়)
+    return yield_with_retry(
+        client=message._client, # ক্লাস্টার ক্লায়েন্ট পাস করা হচ্ছে
+        message=message,
+        file_id=file_id,
+        start=start,
+        end=end,
+        peers=peers, # Striped mode এ অন্য ক্লায়েন্টগুলো
+        resolver=resolver # FloodWait এ handoff এর জন্য অন্য ক্লায়েন্ট
+    )
+
+async def multipart_body(message, file_id, multipart: MultipartRanges, peers=(), resolver=None):
+    """multipart/byteranges: প্রতিটি range এর আগে part header, শেষে closing boundary"""
+    for start, end in multipart.ranges:
+        yield multipart.part_header(start, end)
+        async for chunk in range_body(message, file_id, start, end, peers, resolver):
+            yield chunk
+        yield b"\r\n"
+    yield multipart.closing()
 
 # --- 🔥 Main Media Streamer ---
-async def media_streamer(request, message: Message, custom_file_name=None):
+async def media_streamer(request, message: Message, custom_file_name=None, peers=(), resolver=None):
     try:
         media = getattr(message, message.media.value, None)
         if not media:
@@ -71,61 +147,100 @@ async def media_streamer(request, message: Message, custom_file_name=None):
         encoded_file_name = quote(file_name)
         mime_type = getattr(media, "mime_type", "video/mp4") or "video/mp4"
 
-        # --- RANGE HEADER HANDLING (Math Logic) ---
-        range_header = request.headers.get("Range")
-        if range_header:
-            try:
-                start, end = range_header.replace("bytes=", "").split("-")
-                start = int(start)
-                end = int(end) if end else file_size - 1
-                status = 206
-            except ValueError:
-                start = 0
-                end = file_size - 1
-                status = 200
-        else:
-            start = 0
-            end = file_size - 1
-            status = 200
-
-        if start >= file_size:
-            return web.Response(status=416, headers={"Content-Range": f"bytes */{file_size}"})
+        # --- VALIDATORS (If-Range এর জন্য) ---
+        etag = f'"{media.file_unique_id}"'
+        last_modified = formatdate(message.date.timestamp(), usegmt=True) if message.date else None
 
-        # --- 🧮 OFFSET CALCULATION (OffsetInvalid Fix) ---
-        # এই ক্যালকুলেশনটি custom_dl এর জন্য খুবই জরুরি
-        offset = start - (start % TG_CHUNK) 
-        chunk_index = offset // TG_CHUNK
-        first_part_cut = start - offset
-        last_part_cut = (end % TG_CHUNK) + 1
-        part_count = math.ceil(end / TG_CHUNK) - math.floor(offset / TG_CHUNK)
-
-        # --- HEADERS ---
-        content_length = end - start + 1
         headers = {
-            "Content-Type": mime_type,
             "Accept-Ranges": "bytes",
+            "ETag": etag,
             "Content-Disposition": f'attachment; filename="{file_name}"; filename*=UTF-8\'\'{encoded_file_name}',
-            "Content-Length": str(content_length),
         }
+        if last_modified:
+            headers["Last-Modified"] = last_modified
         headers.update(cors_headers())
 
-        if status == 206:
+        # --- RANGE HEADER HANDLING (RFC 7233) ---
+        range_header = request.headers.get("Range")
+        if range_header and not if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+            range_header = None # ফাইল বদলে গেছে → পুরো ফাইল
+
+        try:
+            ranges = parse_range_header(range_header, file_size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{file_size}"
+            return web.Response(status=416, headers=headers)
+
+        multipart = None
+        if ranges is None:
+            status = 200
+            start, end = 0, file_size - 1
+            headers["Content-Type"] = mime_type
+            headers["Content-Length"] = str(file_size)
+        elif len(ranges) == 1:
+            status = 206
+            start, end = ranges[0]
+            headers["Content-Type"] = mime_type
+            headers["Content-Length"] = str(end - start + 1)
             headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        else:
+            status = 206
+            multipart = MultipartRanges(ranges, file_size, mime_type)
+            headers["Content-Type"] = multipart.mime_type
+            headers["Content-Length"] = str(multipart.content_length())
+
+        # --- HEAD: শুধু হেডার, Telegram ডাউনলোড শুরু হবে না ---
+        # multipart এ start/end নেই; খালি (0 বাইট) ফাইলে বডি নেই
+        empty = multipart is None and end < start
+        if request.method == "HEAD" or empty:
+            return web.Response(status=status, headers=headers)
 
         # --- START STREAMING ---
-        # আমরা সরাসরি custom_dl কল না করে আমাদের 'yield_with_retry' কল করব
-        body = yield_with_retry(
-            client=message._client, # ক্লাস্টার ক্লায়েন্ট পাস করা হচ্ছে
-            message=message,
-            file_id=file_id,
-            chunk_index=chunk_index,
-            first_part_cut=first_part_cut,
-            last_part_cut=last_part_cut,
-            part_count=part_count
-        )
-
-        return web.Response(status=status, body=body, headers=headers)
+        if multipart:
+            body = multipart_body(message, file_id, multipart, peers, resolver)
+        else:
+            body = range_body(message, file_id, start, end, peers, resolver)
 
     except Exception as e:
         logging.error(f"Stream Helper Error: {e}")
         raise web.HTTPInternalServerError()
+
+    # 📡 পাঠানো বাইট এই ফাইল আর রিকুয়েস্টের ক্লায়েন্টের নামে হিসাব হবে
+    account = (media.file_unique_id, message._client.name)
+    return await write_stream(request, status, headers, body, account)
+
+# --- 📤 STREAM WRITER (Back-pressure সহ) ---
+async def write_stream(request, status, headers, body, account=None):
+    """
+    web.StreamResponse দিয়ে সরাসরি সকেটে লেখা।
+    resp.write() সকেট বাফার ভরে গেলে drain এ অপেক্ষা করে, তাই ভিউয়ার ধীর হলে
+    Telegram fetcher ও নিজে থেকেই থেমে থাকে (read-ahead window এর বেশি আগায় না)।
+    account: (unique_id, client name) → সকেটে লেখা বাইট traffic meter এ যোগ হয়
+    """
+    resp = web.StreamResponse(status=status, headers=headers)
+    await resp.prepare(request)
+    try:
+        async for chunk in body:
+            # প্রথম চাঙ্ক Telegram থেকে আসার পরে (MTProto latency সহ) TTFB
+            first_byte(request)
+            try:
+                await resp.write(chunk)
+            except ConnectionResetError:
+                # ভিউয়ার ডিসকানেক্ট/Seek করেছে: স্বাভাবিক ঘটনা
+                # (Telegram সাইডের ConnectionResetError নিচে ধরা হয়, সেটা resume শেষে এসেছে)
+                return resp
+            if account:
+                traffic.sent(*account, len(chunk))
+                popularity.add_bytes(account[0], len(chunk))
+                client_served.inc(account[1], amount=len(chunk))
+    except Exception as e:
+        # হেডার চলে গেছে, এখন আর 500 দেওয়া যাবে না; কানেকশন বন্ধ করে দেওয়া
+        # (Content-Length মিলবে না, তাই প্লেয়ার বুঝবে আর আবার রিকুয়েস্ট করবে)
+        logger.error(f"Stream Write Error: {e}")
+        if request.transport:
+            request.transport.close()
+        return resp
+    finally:
+        await body.aclose()
+    await resp.write_eof()
+    return resp
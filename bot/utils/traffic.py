@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from bot.info import Config
+from bot.utils.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficMeter:
+    """
+    অ্যাপ লেভেলের বাইট হিসাব: ভিউয়ারকে কত বাইট পাঠানো হলো (sent) আর Telegram থেকে
+    কত বাইট আনা হলো (received), ফাইল আর ক্লায়েন্ট অনুযায়ী।
+    হিসাব মেমরিতে জমে, `interval` পরপর একসাথে `$inc` দিয়ে Mongo তে flush হয়
+    (ট্রাফিক না থাকলে শুধু মাস বদলের চেক, কোনো `$inc` না)।
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._files = {}     # unique_id -> [sent, received]
+        self._clients = {}   # client name -> [sent, received]
+        self._flushing = None
+        # প্রসেস চালু হওয়ার পর থেকে মোট (flush হোক বা না হোক)
+        self.sent_total = 0
+        self.received_total = 0
+
+    @staticmethod
+    def _add(table, key, slot, size):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [0, 0]
+        entry[slot] += size
+
+    def sent(self, unique_id, client_name, size):
+        self.sent_total += size
+        self._add(self._files, unique_id, 0, size)
+        self._add(self._clients, client_name, 0, size)
+
+    def received(self, unique_id, client_name, size):
+        self.received_total += size
+        self._add(self._files, unique_id, 1, size)
+        self._add(self._clients, client_name, 1, size)
+
+    def pending(self):
+        """এখনো flush না হওয়া হিসাব: {client name: (sent, received)}"""
+        return {name: tuple(v) for name, v in self._clients.items()}
+
+    async def flush(self):
+        # একসাথে দুইটা flush চললে একই হিসাব দুইবার যোগ হতে পারে, তাই একটাই
+        if self._flushing is not None and not self._flushing.done():
+            return await asyncio.shield(self._flushing)
+        self._flushing = asyncio.ensure_future(self._flush())
+        return await asyncio.shield(self._flushing)
+
+    async def _flush(self):
+        # মাস বদলের রিসেট প্রতি tick এ: ট্রাফিক না থাকলেও নতুন মাসে /stats আগের মাসের হিসাব দেখাবে না
+        try:
+            await db.check_streamer_reset()
+            rolled = True
+        except Exception as e:
+            logger.warning(f"Traffic Month Check Error: {e}")
+            rolled = False
+        if not self._clients and not self._files:
+            return
+        files, clients = self._files, self._clients
+        self._files, self._clients = {}, {}
+
+        # দুইটা আলাদা write: যেটা ফেল করেছে শুধু সেটার হিসাব ফেরত রাখা হয়,
+        # না হলে সফল write এর বাইট পরের flush এ আবার যোগ হবে (দুইবার গোনা)
+        if clients and not rolled:
+            self._merge(self._clients, clients)  # আগের মাসের হিসাবে যোগ না হয়, পরের tick এ
+        elif clients:
+            try:
+                await db.add_client_traffic(clients)
+            except Exception as e:
+                logger.warning(f"Traffic Flush Error (clients): {e}")
+                self._merge(self._clients, clients)
+
+        try:
+            failed = await db.add_file_traffic(files)
+        except Exception as e:
+            logger.warning(f"Traffic Flush Error (files): {e}")
+            failed = files
+        self._merge(self._files, failed)
+
+    def _merge(self, table, pending):
+        # হিসাব হারাবে না: পরের flush এ আবার চেষ্টা
+        for key, (sent, received) in pending.items():
+            self._add(table, key, 0, sent)
+            self._add(table, key, 1, received)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+traffic = TrafficMeter(Config.TRAFFIC_FLUSH_INTERVAL)
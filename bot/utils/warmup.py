@@ -0,0 +1,185 @@
+import struct
+import asyncio
+import logging
+from collections import OrderedDict
+from bot.info import Config
+from bot.utils.database import db
+from bot.utils.chunk_store import chunk_store
+from bot.utils.chunk_plan import TG_CHUNK
+from bot.utils.client_scheduler import client_scheduler
+from bot.utils.custom_dl import ByteStreamer, ChunkSource, SourceSet
+from bot.utils.file_properties import file_locations, get_file_dc
+from bot.utils.location_health import location_health
+
+logger = logging.getLogger(__name__)
+
+# moov সাধারণত কয়েক MB এর বেশি হয় না
+MAX_MOOV_CHUNKS = 4
+
+
+def mp4_moov_span(head, file_size):
+    """
+    প্রথম চাঙ্কের top-level MP4 box গুলো পড়ে `moov` এর (start, end) বাইট বের করা।
+    head এর মধ্যে moov পেলে তার আসল সাইজ দিয়ে, head এর বাইরে গেলে পরের box থেকে
+    (non-faststart ফাইলে mdat এর পরেই moov থাকে) MAX_MOOV_CHUNKS পর্যন্ত। MP4 না হলে None।
+    """
+    if len(head) < 8 or head[4:8] != b"ftyp":
+        return None
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box = struct.unpack_from(">I4s", head, offset)
+        if size == 1:
+            # 64-bit largesize (বড় mdat)
+            if offset + 16 > len(head):
+                return None
+            size = struct.unpack_from(">Q", head, offset + 8)[0]
+        elif size == 0:
+            size = file_size - offset  # এই box ফাইলের শেষ পর্যন্ত
+        if box == b"moov":
+            return offset, min(file_size, offset + size) - 1
+        if size < 8:
+            return None
+        offset += size
+    if offset >= file_size:
+        return None
+    return offset, min(file_size, offset + MAX_MOOV_CHUNKS * TG_CHUNK) - 1
+
+
+def warm_indexes(file_size, head, head_chunks, tail_chunks):
+    """কোন চাঙ্কগুলো আগে থেকে আনা হবে: শুরুর N টা + moov (MP4 না হলে শেষের M টা)"""
+    last = (file_size - 1) // TG_CHUNK
+    indexes = set(range(min(head_chunks, last + 1)))
+    moov = mp4_moov_span(head, file_size) if head else None
+    if moov is not None:
+        start, end = moov
+        indexes.update(range(start // TG_CHUNK, end // TG_CHUNK + 1))
+    elif tail_chunks:
+        indexes.update(range(max(0, last - tail_chunks + 1), last + 1))
+    return sorted(indexes)
+
+
+async def _source_set(clients, file_data):
+    """ফাইলটা অ্যাক্সেস করতে পারে এমন প্রথম সুস্থ (client, location) জোড়া দিয়ে SourceSet"""
+    candidates = client_scheduler.candidates(clients, dc_id=get_file_dc(file_data))
+    client, msg = await location_health.locate(file_data['_id'], file_data, candidates, file_locations(file_data))
+    if msg is None:
+        return None
+    file_id = getattr(msg, msg.media.value).file_id
+    return SourceSet([ChunkSource(ByteStreamer(client), file_id)])
+
+
+async def warm_file(clients, unique_id, pin=False):
+    """
+    একটি ফাইলের শুরুর চাঙ্ক আর moov/শেষের চাঙ্ক ডিস্ক চাঙ্ক ক্যাশে আনা,
+    যাতে প্লেয়ারের প্রথম দুইটা রিকুয়েস্ট (byte 0 আর moov) cold MTProto fetch না হয়।
+    pin=True হলে চাঙ্কগুলো LRU eviction থেকে রক্ষা পায়।
+    রিটার্ন: নতুন করে আনা চাঙ্কের সংখ্যা।
+    """
+    if not chunk_store.enabled:
+        return 0
+    file_data = await db.get_file(unique_id)
+    file_size = (file_data or {}).get('file_size') or 0
+    if not file_size:
+        return 0
+
+    source_set = None
+    fetched = 0
+
+    async def fetch(index):
+        nonlocal source_set, fetched
+        if source_set is None:
+            source_set = await _source_set(clients, file_data)
+            if source_set is None:
+                raise LookupError("No client can access this file")
+        fetched += 1
+        chunk = await ByteStreamer.fetch_shared(source_set, index, TG_CHUNK)
+        # অন্য স্ট্রিমের in-flight/রিং থেকে এলে ক্যাশে লেখা হয়নি
+        if chunk:
+            await chunk_store.put(unique_id, index, chunk)
+        return chunk
+
+    # Pin আগে, যাতে চাঙ্কটা ক্যাশে ঢোকার যোগ্য হয় (popularity এর ফাইল আগেই hot)
+    if pin:
+        chunk_store.pin(unique_id, 0)
+    # প্রথম চাঙ্ক লাগবেই (moov খোঁজার জন্য), ক্যাশে থাকলে সেখান থেকে
+    head = await chunk_store.get(unique_id, 0) if chunk_store.contains(unique_id, 0) else None
+    if head is None:
+        head = await fetch(0)
+    for index in warm_indexes(file_size, head, Config.PREWARM_HEAD_CHUNKS, Config.PREWARM_TAIL_CHUNKS):
+        if pin:
+            chunk_store.pin(unique_id, index)
+        if index and not chunk_store.contains(unique_id, index):
+            await fetch(index)
+    return fetched
+
+
+async def warm_files(clients, unique_ids):
+    """একটার পর একটা (লাইভ স্ট্রিমের সাথে প্রতিযোগিতা কম রাখতে)"""
+    total = 0
+    for unique_id in unique_ids:
+        try:
+            total += await warm_file(clients, unique_id)
+        except Exception as e:
+            logger.warning(f"Pre-warm Failed ({unique_id}): {e}")
+    if total:
+        logger.info(f"🔥 Pre-warmed {total} chunks for {len(unique_ids)} hot files")
+    return total
+
+
+class WarmupQueue:
+    """
+    নতুন যোগ হওয়া বা প্রথমবার রিকুয়েস্ট হওয়া ফাইলের head/moov চাঙ্ক ব্যাকগ্রাউন্ডে
+    এনে pin করা। একই ফাইল বারবার queue তে ঢোকে না; queue ভর্তি থাকলে বাদ দেওয়া হয়
+    (এটা শুধু অপ্টিমাইজেশন, স্ট্রিম এটার জন্য অপেক্ষা করে না)।
+    """
+
+    def __init__(self, workers, maxsize=200, remember=5000):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.remember = remember
+        self._queue = None
+        self._seen = OrderedDict()  # সম্প্রতি queue তে দেওয়া unique_id
+        self._tasks = []
+        self.warmed = 0
+        self.dropped = 0
+
+    def start(self, clients):
+        if self._queue is not None or not chunk_store.enabled:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [asyncio.ensure_future(self._worker(clients)) for _ in range(self.workers)]
+
+    def submit(self, unique_id):
+        if self._queue is None:
+            return
+        if unique_id in self._seen:
+            self._seen.move_to_end(unique_id)
+            return
+        try:
+            self._queue.put_nowait(unique_id)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._seen[unique_id] = None
+        while len(self._seen) > self.remember:
+            self._seen.popitem(last=False)
+
+    async def _worker(self, clients):
+        while True:
+            unique_id = await self._queue.get()
+            try:
+                fetched = await warm_file(clients, unique_id, pin=True)
+                self.warmed += fetched
+            except Exception as e:
+                logger.warning(f"Warm-up Failed ({unique_id}): {e}")
+                self._seen.pop(unique_id, None)  # পরের রিকুয়েস্টে আবার চেষ্টা
+            finally:
+                self._queue.task_done()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+warmup_queue = WarmupQueue(Config.WARMUP_WORKERS)
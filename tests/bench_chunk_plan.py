@@ -0,0 +1,74 @@
+"""
+চাঙ্ক প্ল্যানারের micro-benchmark: প্লেয়ারের মত র‍্যান্ডম Range রিকুয়েস্টে
+কত বাইট চাওয়া হলো, কত বাইট Telegram থেকে আনা হলো (over-fetch) আর প্ল্যান করতে কত সময় লাগে।
+পুরনো ceil/floor হিসাবের সাথে তুলনাও দেখায় (short read কতগুলো)।
+
+    python -m tests.bench_chunk_plan [requests]
+"""
+import sys
+import math
+import random
+import timeit
+from bot.utils.chunk_plan import TG_CHUNK, plan_range
+
+
+def legacy_part_count(start, end):
+    # আগের media_streamer এর হিসাব
+    return math.ceil(end / TG_CHUNK) - math.floor(start / TG_CHUNK)
+
+
+def player_ranges(rng, count):
+    """
+    Seek, শুরু থেকে পুরো ফাইল, moov (শেষের দিকে), ছোট probe আর ডাউনলোড ম্যানেজারের
+    MiB-aligned সেগমেন্ট (end ঠিক চাঙ্ক বাউন্ডারিতে) রিকুয়েস্টের মিশ্রণ
+    """
+    for _ in range(count):
+        size = rng.randint(50, 3000) * TG_CHUNK + rng.randrange(TG_CHUNK)
+        kind = rng.random()
+        if kind < 0.4:
+            start = rng.randrange(size)
+            end = size - 1
+        elif kind < 0.6:
+            start, end = 0, size - 1
+        elif kind < 0.7:
+            start = size - rng.randint(1, 4 * TG_CHUNK)
+            end = size - 1
+        elif kind < 0.85:
+            start = rng.randrange(size // TG_CHUNK - 8) * TG_CHUNK
+            end = start + rng.randint(1, 8) * TG_CHUNK
+        else:
+            start = rng.randrange(size)
+            end = min(size - 1, start + rng.randint(0, 2 * TG_CHUNK))
+        yield max(0, start), end
+
+
+def main(count):
+    ranges = list(player_ranges(random.Random(42), count))
+
+    requested = fetched = 0
+    worst = 0
+    legacy_short = 0
+    for start, end in ranges:
+        plan = plan_range(start, end)
+        want = end - start + 1
+        got = plan.part_count * TG_CHUNK
+        requested += want
+        fetched += got
+        # চাঙ্ক গ্র্যানুলারিটির জন্য over-fetch সর্বোচ্চ দুই দিকে এক চাঙ্কের কম
+        assert got - want < 2 * TG_CHUNK, (start, end)
+        worst = max(worst, got - want)
+        if legacy_part_count(start, end) < plan.part_count:
+            legacy_short += 1
+
+    per_call = timeit.timeit(lambda: [plan_range(s, e) for s, e in ranges], number=5) / (5 * len(ranges))
+
+    print(f"Requests:        {len(ranges)}")
+    print(f"Bytes requested: {requested / TG_CHUNK:,.1f} MiB")
+    print(f"Bytes fetched:   {fetched / TG_CHUNK:,.1f} MiB (upper bound, last file chunk can be shorter)")
+    print(f"Over-fetch:      {(fetched - requested) / requested:.4%} | worst {worst / TG_CHUNK:.2f} MiB/request")
+    print(f"Legacy formula:  {legacy_short} short reads ({legacy_short / len(ranges):.1%})")
+    print(f"plan_range:      {per_call * 1e6:.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+
+custom_dl = pytest.importorskip("bot.utils.custom_dl")
+
+
+def test_viewer_joining_after_last_waiter_left_gets_a_new_fetch():
+    flights = custom_dl.ChunkFlights(0)
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return b"chunk"
+
+    async def run():
+        first = asyncio.ensure_future(flights.get("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        # প্রথম ভিউয়ার চলে যাওয়ার ঠিক পরে (done-callback চলার আগেই) নতুন ভিউয়ার
+        await asyncio.sleep(0)
+        assert await flights.get("k", fetch) == b"chunk"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+    assert len(fetches) == 2
+
+
+def test_concurrent_viewers_share_one_fetch():
+    flights = custom_dl.ChunkFlights(4)
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return b"chunk"
+
+    async def run():
+        results = await asyncio.gather(*(flights.get("k", fetch) for _ in range(5)))
+        assert results == [b"chunk"] * 5
+        # শেষ হওয়ার পরে রিং থেকে
+        assert await flights.get("k", fetch) == b"chunk"
+
+    asyncio.run(run())
+    assert len(fetches) == 1 and flights.shared == 4 and flights.ring_hits == 1
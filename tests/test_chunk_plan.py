@@ -0,0 +1,179 @@
+import random
+import asyncio
+import pytest
+from bot.utils.chunk_plan import TG_CHUNK, ChunkPlan, plan_range, cut_chunk
+
+# ছোট চাঙ্ক সাইজে সব (start, end) জোড়া পুরোটা চেক করা যায়
+SMALL_CHUNK = 16
+
+
+class FakeTelegramFile:
+    """
+    মেমরির বাইট থেকে চাঙ্ক দেয় আর কতগুলো চাঙ্ক আনা হলো গোনে।
+    একই অবজেক্ট media session (upload.GetFile) আর ক্লায়েন্ট (CDN fallback এর stream_media) দুটোই।
+    """
+
+    name = "fake"
+
+    def __init__(self, size, chunk_size):
+        self.data = bytes(random.Random(size).getrandbits(8) for _ in range(size))
+        self.chunk_size = chunk_size
+        self.fetched = []
+
+    def get_chunk(self, index):
+        self.fetched.append(index)
+        return self.data[index * self.chunk_size:(index + 1) * self.chunk_size]
+
+    async def stream_media(self, file_id, limit=0, offset=0):
+        for index in range(offset, offset + limit):
+            chunk = self.get_chunk(index)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_range(fake, start, end):
+    """প্ল্যান অনুযায়ী চাঙ্ক এনে কেটে জোড়া লাগানো (yield_file এর মত)"""
+    plan = plan_range(start, end, fake.chunk_size)
+    out = b""
+    for position in range(plan.part_count):
+        chunk = fake.get_chunk(plan.chunk_index + position)
+        out += bytes(cut_chunk(chunk, position, plan.first_part_cut, plan.last_part_cut, plan.part_count))
+    return plan, out
+
+
+def all_ranges(size):
+    for start in range(size):
+        for end in range(start, size):
+            yield start, end
+
+
+@pytest.mark.parametrize("size", [1, 15, 16, 17, 31, 32, 33, 48, 50])
+def test_every_range_is_exact(size):
+    fake = FakeTelegramFile(size, SMALL_CHUNK)
+    for start, end in all_ranges(size):
+        fake.fetched.clear()
+        plan, out = read_range(fake, start, end)
+        assert out == fake.data[start:end + 1], (start, end)
+        # শুধু range এর বাইট আছে এমন চাঙ্কই আনা হয়
+        assert fake.fetched == list(range(start // SMALL_CHUNK, end // SMALL_CHUNK + 1)), (start, end)
+
+
+def test_random_ranges_on_real_chunk_size():
+    rng = random.Random(7)
+    for _ in range(2000):
+        size = rng.randint(1, 50 * TG_CHUNK)
+        start = rng.randrange(size)
+        end = rng.randint(start, size - 1)
+        plan = plan_range(start, end)
+        covered_start = plan.chunk_index * TG_CHUNK + plan.first_part_cut
+        covered_end = (plan.chunk_index + plan.part_count - 1) * TG_CHUNK + plan.last_part_cut - 1
+        assert (covered_start, covered_end) == (start, end)
+        assert 0 <= plan.first_part_cut < TG_CHUNK
+        assert 0 < plan.last_part_cut <= TG_CHUNK
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # পুরো প্রথম চাঙ্ক
+    (0, TG_CHUNK - 1, ChunkPlan(0, 0, TG_CHUNK, 1)),
+    # end ঠিক পরের চাঙ্কের প্রথম বাইটে (পুরনো ceil/floor হিসাবে এখানে একটা চাঙ্ক কম হত)
+    (0, TG_CHUNK, ChunkPlan(0, 0, 1, 2)),
+    # শুরু ঠিক চাঙ্কের বাউন্ডারিতে
+    (TG_CHUNK, 2 * TG_CHUNK - 1, ChunkPlan(1, 0, TG_CHUNK, 1)),
+    # একই চাঙ্কের ভেতরে শুরু ও শেষ
+    (10, 20, ChunkPlan(0, 10, 21, 1)),
+    # একটা বাইট
+    (5 * TG_CHUNK + 3, 5 * TG_CHUNK + 3, ChunkPlan(5, 3, 4, 1)),
+    # শেষ চাঙ্কের শেষ বাইট
+    (TG_CHUNK - 1, TG_CHUNK - 1, ChunkPlan(0, TG_CHUNK - 1, TG_CHUNK, 1)),
+])
+def test_boundary_plans(start, end, expected):
+    assert plan_range(start, end) == expected
+
+
+@pytest.mark.parametrize("start, end", [(-1, 5), (10, 9)])
+def test_invalid_range(start, end):
+    with pytest.raises(ValueError):
+        plan_range(start, end)
+
+
+def test_last_chunk_shorter_than_chunk_size():
+    # ফাইলের শেষ চাঙ্ক ছোট হলে cut_chunk তার বাইরে যায় না
+    size = 2 * SMALL_CHUNK + 5
+    fake = FakeTelegramFile(size, SMALL_CHUNK)
+    plan, out = read_range(fake, SMALL_CHUNK + 3, size - 1)
+    assert plan.part_count == 2
+    assert out == fake.data[SMALL_CHUNK + 3:]
+
+
+def test_cut_chunk_does_not_copy_full_chunks():
+    chunk = b"x" * SMALL_CHUNK
+    assert cut_chunk(chunk, 1, 3, 5, 3) is chunk
+    assert isinstance(cut_chunk(chunk, 0, 3, 5, 3), memoryview)
+
+
+@pytest.fixture
+def streamer_for(monkeypatch):
+    """
+    আসল ByteStreamer pipeline (read-ahead, single-flight, cut) চালানো হয়;
+    শুধু Telegram এর দিকটা (media session আর upload.GetFile) fake।
+    """
+    custom_dl = pytest.importorskip("bot.utils.custom_dl")
+    from pyrogram.file_id import FileId, FileType
+
+    def make(fake, cdn=False):
+        async def media_session(self, file_id_obj):
+            return fake
+
+        async def get_chunk(session, location, index, chunk_size):
+            if cdn:
+                raise custom_dl.CdnRedirect()
+            await asyncio.sleep(0)  # read-ahead এর রিকুয়েস্টগুলো একসাথে চলুক
+            return session.get_chunk(index)
+
+        monkeypatch.setattr(custom_dl.ByteStreamer, "generate_media_session", media_session)
+        monkeypatch.setattr(custom_dl.ByteStreamer, "get_chunk", staticmethod(get_chunk))
+        # আগের রেঞ্জের চাঙ্ক রিং/ডিস্ক ক্যাশ থেকে এলে fetch গোনা ভুল হবে
+        monkeypatch.setattr(custom_dl, "chunk_flights", custom_dl.ChunkFlights(0))
+        monkeypatch.setattr(custom_dl.chunk_store, "max_bytes", 0)
+        file_id = FileId(
+            file_type=FileType.DOCUMENT, dc_id=1, media_id=len(fake.data),
+            access_hash=0, file_reference=b""
+        ).encode()
+        return custom_dl.ByteStreamer(fake, prefetch=3), file_id
+
+    return make
+
+
+async def stream_range(streamer, file_id, start, end):
+    plan = plan_range(start, end, SMALL_CHUNK)
+    out = b""
+    async for part in streamer.yield_file(file_id, *plan, chunk_size=SMALL_CHUNK):
+        out += bytes(part)
+    return out
+
+
+def test_yield_file_every_range(streamer_for):
+    size = 5 * SMALL_CHUNK + 7
+    fake = FakeTelegramFile(size, SMALL_CHUNK)
+    streamer, file_id = streamer_for(fake)
+
+    async def run():
+        for start, end in all_ranges(size):
+            fake.fetched.clear()
+            assert await stream_range(streamer, file_id, start, end) == fake.data[start:end + 1], (start, end)
+            assert sorted(fake.fetched) == list(range(start // SMALL_CHUNK, end // SMALL_CHUNK + 1)), (start, end)
+
+    asyncio.run(run())
+
+
+def test_yield_file_cdn_fallback(streamer_for):
+    size = 4 * SMALL_CHUNK + 3
+    fake = FakeTelegramFile(size, SMALL_CHUNK)
+    streamer, file_id = streamer_for(fake, cdn=True)
+
+    async def run():
+        for start, end in [(0, size - 1), (SMALL_CHUNK + 5, 3 * SMALL_CHUNK), (size - 2, size - 1)]:
+            assert await stream_range(streamer, file_id, start, end) == fake.data[start:end + 1], (start, end)
+
+    asyncio.run(run())